@@ -4,7 +4,7 @@
     'summary': 'Machine Performance, Production Reports, Tasks',
     'author': 'Constantine',
     'category': 'Manufacturing/MES',
-    'depends': ['base', 'mrp', 'mail', 'hr', 'queue_job'],
+    'depends': ['base', 'mrp', 'mail', 'bus', 'hr', 'queue_job'],
     'data': [
         'security/mes_security.xml',
         'security/ir.model.access.csv',
@@ -31,6 +31,7 @@
         
         'views/mes_telemetry_views.xml',
         'views/mes_machine_settings_views.xml',
+        'views/mes_regen_views.xml',
         'views/mes_report_base_views.xml',
         
         'wizard/mes_reject_report.xml',        
@@ -54,6 +55,10 @@
         ],
     },
     
+    'external_dependencies': {
+        'python': ['numpy'],
+    },
+
     'installable': True,
     'application': True,
     'license': 'LGPL-3',
@@ -35,6 +35,16 @@ class MesTelemetryApi(http.Controller):
             
         return res
 
+    def _insert_raw(self, cur, tbl, val_type, rows):
+        q = f"""
+            INSERT INTO {tbl} (time, arrived_time, signal_id, value, evt_id) 
+            SELECT v.ts::timestamptz, v.arr_ts::timestamptz, d.signal_id, v.val::{val_type}, v.evt_id 
+            FROM (VALUES %s) AS v (ts, arr_ts, machine_name, tag_name, val, evt_id) 
+            JOIN signal_dict d ON d.machine_name = v.machine_name AND d.tag_name = v.tag_name 
+            ON CONFLICT (signal_id, time, evt_id) DO NOTHING;
+        """
+        psycopg2.extras.execute_values(cur, q, rows, page_size=10000)
+
     @http.route('/mes/api/import_historical', type='json', auth='user', methods=['POST'], csrf=False)
     def import_hist(self, events=None, counts=None, processes=None, **kw):
         evts = self._parse_batch(events)
@@ -46,29 +56,20 @@ class MesTelemetryApi(http.Controller):
         try:
             with db._connection() as conn:
                 with conn.cursor() as cur:
-                    if evts:
-                        q_evt = """
-                            INSERT INTO telemetry_event (time, arrived_time, machine_name, tag_name, value, evt_id) 
+                    sigs = sorted({(r[2], r[3]) for r in evts + cnts + prcs if r[2] and r[3]})
+                    if sigs:
+                        psycopg2.extras.execute_values(cur, """
+                            INSERT INTO signal_dict (machine_name, tag_name) 
                             VALUES %s 
-                            ON CONFLICT (time, machine_name, tag_name, evt_id) DO NOTHING;
-                        """
-                        psycopg2.extras.execute_values(cur, q_evt, evts, page_size=10000)
+                            ON CONFLICT (machine_name, tag_name) DO NOTHING;
+                        """, sigs, page_size=10000)
 
+                    if evts:
+                        self._insert_raw(cur, 'telemetry_event_raw', 'integer', evts)
                     if cnts:
-                        q_cnt = """
-                            INSERT INTO telemetry_count (time, arrived_time, machine_name, tag_name, value, evt_id) 
-                            VALUES %s 
-                            ON CONFLICT (time, machine_name, tag_name, evt_id) DO NOTHING;
-                        """
-                        psycopg2.extras.execute_values(cur, q_cnt, cnts, page_size=10000)
-
+                        self._insert_raw(cur, 'telemetry_count_raw', 'bigint', cnts)
                     if prcs:
-                        q_prc = """
-                            INSERT INTO telemetry_process (time, arrived_time, machine_name, tag_name, value, evt_id) 
-                            VALUES %s 
-                            ON CONFLICT (time, machine_name, tag_name, evt_id) DO NOTHING;
-                        """
-                        psycopg2.extras.execute_values(cur, q_prc, prcs, page_size=10000)
+                        self._insert_raw(cur, 'telemetry_process_raw', 'double precision', prcs)
             
             return {
                 'status': 'success', 
@@ -9,4 +9,6 @@ from . import mes_planned_downtime
 from . import mes_machine_settings
 from . import mes_report_base
 from . import mes_machine_operation
-from . import mes_logger_status
\ No newline at end of file
+from . import mes_logger_status
+from . import mes_regen
+from . import mes_oee_accumulator
@@ -3,6 +3,7 @@ import pytz
 import logging
 from datetime import datetime, timedelta, time
 import math
+import psycopg2.extras
 from odoo import models, fields, api
 from odoo.exceptions import ValidationError
 from odoo.http import request
@@ -32,45 +33,120 @@ class MesShifts(models.Model):
             else:
                 s.duration = 24.0 - s.start_hour + s.end_hour
 
+    @api.model_create_multi
+    def create(self, vals_list):
+        recs = super().create(vals_list)
+        self.env['mes.shift.instance'].cron_generate_calendar()
+        return recs
+
+    def write(self, vals):
+        res = super().write(vals)
+        if {'start_hour', 'end_hour', 'company_id', 'workcenter_ids'} & set(vals):
+            self.env['mes.shift.instance'].search([
+                ('shift_id', 'in', self.ids),
+                ('start_utc', '>=', fields.Datetime.now())
+            ]).unlink()
+            self.env['mes.shift.instance'].cron_generate_calendar()
+        return res
+
     @api.model
     def get_current_shift_window(self, wc=None):
-        now_utc = fields.Datetime.now()
-        tz_name = wc.company_id.tz if wc and wc.company_id.tz else 'UTC'
-        mac_tz = pytz.timezone(tz_name)
-        now_mac = pytz.utc.localize(now_utc).astimezone(mac_tz).replace(tzinfo=None)
-        
-        curr_h = now_mac.hour + now_mac.minute / 60.0 + now_mac.second / 3600.0
-        
-        shifts = self.search([('company_id', '=', wc.company_id.id)])
-        valid_shifts = [s for s in shifts if not (wc and s.workcenter_ids and wc.id not in s.workcenter_ids.ids)]
-        
-        curr_s = None
-        for s in valid_shifts:
-            if s.start_hour < s.end_hour:
-                if s.start_hour <= curr_h < s.end_hour:
-                    curr_s = s
-                    break
-            else:
-                if curr_h >= s.start_hour or curr_h < s.end_hour:
-                    curr_s = s
-                    break
-        
-        if not curr_s:
+        inst = self.env['mes.shift.instance']._locate(wc, fields.Datetime.now())
+        if not inst:
             return None, None
 
-        start_d = now_mac.date()
-        if curr_s.start_hour > curr_s.end_hour and curr_h < curr_s.end_hour:
-            start_d -= timedelta(days=1)
-            
-        s_time = datetime.combine(
-            start_d,
-            time(hour=int(curr_s.start_hour), minute=int((curr_s.start_hour % 1) * 60))
-        )
-        
-        e_time = s_time + timedelta(hours=curr_s.duration)
-        
+        mac_tz = pytz.timezone(wc.company_id.tz or 'UTC')
+        s_time = pytz.utc.localize(inst.start_utc).astimezone(mac_tz).replace(tzinfo=None)
+        e_time = pytz.utc.localize(inst.end_utc).astimezone(mac_tz).replace(tzinfo=None)
         return s_time, e_time
 
+class MesShiftInstance(models.Model):
+    _name = 'mes.shift.instance'
+    _description = 'Shift Calendar'
+    _order = 'start_utc'
+
+    workcenter_id = fields.Many2one('mrp.workcenter', string='Machine', required=True, ondelete='cascade', index=True)
+    shift_id = fields.Many2one('mes.shift', string='Shift', required=True, ondelete='cascade')
+    company_id = fields.Many2one('res.company', related='shift_id.company_id', store=True)
+    date = fields.Date(string='Logical Date', required=True)
+    start_utc = fields.Datetime(string='Start', required=True)
+    end_utc = fields.Datetime(string='End', required=True)
+
+    _sql_constraints = [
+        ('wc_shift_date_uniq', 'unique(workcenter_id, shift_id, date)', 'Shift instance already exists!')
+    ]
+
+    def init(self):
+        self.env.cr.execute("""
+            CREATE INDEX IF NOT EXISTS mes_shift_instance_wc_range_idx
+            ON mes_shift_instance (workcenter_id, start_utc, end_utc)
+        """)
+
+    @api.model
+    def _build_bounds(self, shift, tgt_date, tz):
+        s_loc = datetime.combine(tgt_date, time(hour=int(shift.start_hour), minute=int((shift.start_hour % 1) * 60)))
+        e_loc = s_loc + timedelta(hours=shift.duration)
+        return (
+            tz.localize(s_loc, is_dst=False).astimezone(pytz.utc).replace(tzinfo=None),
+            tz.localize(e_loc, is_dst=False).astimezone(pytz.utc).replace(tzinfo=None),
+        )
+
+    @api.model
+    def generate(self, date_from, date_to, workcenters=None):
+        if workcenters is None:
+            workcenters = self.env['mrp.workcenter'].search([('machine_settings_id', '!=', False)])
+        if not workcenters:
+            return 0
+
+        self.env.cr.execute("""
+            SELECT workcenter_id, shift_id, date FROM mes_shift_instance
+            WHERE workcenter_id IN %s AND date BETWEEN %s AND %s
+        """, (tuple(workcenters.ids), date_from, date_to))
+        existing = set(self.env.cr.fetchall())
+
+        shift_cache = {}
+        vals_list = []
+        for wc in workcenters:
+            tz = pytz.timezone(wc.company_id.tz or 'UTC')
+            if wc.company_id.id not in shift_cache:
+                shift_cache[wc.company_id.id] = self.env['mes.shift'].search([('company_id', '=', wc.company_id.id)])
+            val_shifts = [s for s in shift_cache[wc.company_id.id] if not s.workcenter_ids or wc.id in s.workcenter_ids.ids]
+
+            curr_d = date_from
+            while curr_d <= date_to:
+                for shift in val_shifts:
+                    if (wc.id, shift.id, curr_d) in existing:
+                        continue
+                    s_utc, e_utc = self._build_bounds(shift, curr_d, tz)
+                    vals_list.append({
+                        'workcenter_id': wc.id,
+                        'shift_id': shift.id,
+                        'date': curr_d,
+                        'start_utc': s_utc,
+                        'end_utc': e_utc,
+                    })
+                curr_d += timedelta(days=1)
+
+        if vals_list:
+            self.create(vals_list)
+        return len(vals_list)
+
+    @api.model
+    def cron_generate_calendar(self):
+        horizon = int(self.env['ir.config_parameter'].sudo().get_param('mes_core.shift_horizon_days', 14))
+        today = fields.Date.context_today(self)
+        self.generate(today - timedelta(days=1), today + timedelta(days=horizon))
+
+    @api.model
+    def _locate(self, wc, ts_utc):
+        domain = [('workcenter_id', '=', wc.id), ('start_utc', '<=', ts_utc), ('end_utc', '>', ts_utc)]
+        inst = self.search(domain, limit=1)
+        if not inst:
+            tgt_d = ts_utc.date()
+            if self.sudo().generate(tgt_d - timedelta(days=1), tgt_d + timedelta(days=1), wc):
+                inst = self.search(domain, limit=1)
+        return inst
+
 class MesDefects(models.Model):
     _name = 'mes.defect'
     _description = 'QC Defect Types'
@@ -179,25 +255,31 @@ class MesCounts(models.Model):
         if not self._check_recursion():
             raise ValidationError('Error! You cannot create recursive categories.')
 
+    @api.model_create_multi
+    def create(self, vals_list):
+        res = super().create(vals_list)
+        self.env.registry.clear_cache()
+        return res
+
+    def write(self, vals):
+        res = super().write(vals)
+        if {'default_OPCTag', 'is_cumulative'} & set(vals):
+            self.env.registry.clear_cache()
+        return res
+
+    def unlink(self):
+        res = super().unlink()
+        self.env.registry.clear_cache()
+        return res
+
     def get_tag_for_machine(self, machine_id):
-        self.ensure_one()
-        override = self.env['mes.signal.count'].search([
-            ('count_id', '=', self.id),
-            ('machine_id', '=', machine_id.id if isinstance(machine_id, models.Model) else machine_id)
-        ], limit=1)
-        if override:
-            return override.tag_name
-        return self.default_OPCTag
+        return self.get_count_config_for_machine(machine_id)[0]
     
     def get_count_config_for_machine(self, machine_id):
         self.ensure_one()
-        override = self.env['mes.signal.count'].search([
-            ('count_id', '=', self.id),
-            ('machine_id', '=', machine_id.id if isinstance(machine_id, models.Model) else machine_id)
-        ], limit=1)
-        if override:
-            return override.tag_name, override.is_cumulative
-        return self.default_OPCTag, self.is_cumulative
+        mac_id = machine_id.id if isinstance(machine_id, models.Model) else machine_id
+        cfg = self.env['mes.machine.settings']._get_signal_map(mac_id)['count'].get(self.id)
+        return cfg or (self.default_OPCTag, self.is_cumulative)
 
 class MesEvents(models.Model):
     _name = 'mes.event'
@@ -235,15 +317,28 @@ class MesEvents(models.Model):
         if not self._check_recursion():
             raise ValidationError('Error! You cannot create recursive categories.')
 
+    @api.model_create_multi
+    def create(self, vals_list):
+        res = super().create(vals_list)
+        self.env.registry.clear_cache()
+        return res
+
+    def write(self, vals):
+        res = super().write(vals)
+        if {'default_event_tag_type', 'default_plc_value'} & set(vals):
+            self.env.registry.clear_cache()
+        return res
+
+    def unlink(self):
+        res = super().unlink()
+        self.env.registry.clear_cache()
+        return res
+
     def get_mapping_for_machine(self, machine_id):
         self.ensure_one()
-        override = self.env['mes.signal.event'].search([
-            ('event_id', '=', self.id),
-            ('machine_id', '=', machine_id.id if isinstance(machine_id, models.Model) else machine_id)
-        ], limit=1)
-        if override:
-            return override.tag_name, override.plc_value
-        return self.default_event_tag_type, self.default_plc_value
+        mac_id = machine_id.id if isinstance(machine_id, models.Model) else machine_id
+        cfg = self.env['mes.machine.settings']._get_signal_map(mac_id)['event'].get(self.id)
+        return cfg or (self.default_event_tag_type, self.default_plc_value)
 
 class MesProcess(models.Model):
     _name = 'mes.process'
@@ -271,15 +366,28 @@ class MesProcess(models.Model):
             else:
                 rec.complete_name = rec.name
 
+    @api.model_create_multi
+    def create(self, vals_list):
+        res = super().create(vals_list)
+        self.env.registry.clear_cache()
+        return res
+
+    def write(self, vals):
+        res = super().write(vals)
+        if 'default_OPCTag' in vals:
+            self.env.registry.clear_cache()
+        return res
+
+    def unlink(self):
+        res = super().unlink()
+        self.env.registry.clear_cache()
+        return res
+
     def get_tag_for_machine(self, machine_id):
         self.ensure_one()
-        override = self.env['mes.signal.process'].search([
-            ('process_id', '=', self.id),
-            ('machine_id', '=', machine_id.id if isinstance(machine_id, models.Model) else machine_id)
-        ], limit=1)
-        if override:
-            return override.tag_name
-        return self.default_OPCTag
+        mac_id = machine_id.id if isinstance(machine_id, models.Model) else machine_id
+        tag = self.env['mes.machine.settings']._get_signal_map(mac_id)['process'].get(self.id)
+        return tag if tag is not None else self.default_OPCTag
 
 class MesWorkcenter(models.Model):
     _inherit = 'mrp.workcenter'
@@ -317,6 +425,10 @@ class MesWorkcenter(models.Model):
         ('events', 'Through Events'),
         ('states', 'By State Flags')
     ], string='Telemetry FSM Logic', default='events', required=True)
+    fsm_min_state_sec = fields.Integer(string='Min State Duration (sec)', default=0,
+        help="States shorter than this are merged into the preceding interval.")
+    fsm_hysteresis_sec = fields.Integer(string='State Hysteresis (sec)', default=0,
+        help="A return to the previous state within this time is treated as one uninterrupted interval.")
 
     @api.depends('current_first_running_time')
     def _compute_current_first_running_time_disp(self):
@@ -334,6 +446,12 @@ class MesWorkcenter(models.Model):
         ('code_imatec_uniq', 'unique(code_imatec)', 'Imatec Code must be unique!')
     ]
 
+    def write(self, vals):
+        res = super().write(vals)
+        if {'runtime_event_id', 'machine_settings_id'} & set(vals):
+            self.env.registry.clear_cache()
+        return res
+
     @api.model
     def _search(self, domain, offset=0, limit=None, order=None, **kwargs):
         if not self.env.context.get('skip_ip_filter'):
@@ -347,53 +465,88 @@ class MesWorkcenter(models.Model):
             ('runtime_event_id', '!=', False),
             ('production_count_id', '!=', False)
         ])
-        if not workcenters:
-            return
+        if workcenters:
+            workcenters._store_kpi_snapshots(advance=True)
+        self.env['mes.oee.accumulator']._gc()
 
-        settings_model = self.env['mes.machine.settings']
-        oee_results = settings_model.get_realtime_oee_batch(workcenters)
+    def _store_kpi_snapshots(self, advance=False):
+        oee_results = self.env['mes.machine.settings'].get_realtime_oee_batch(self, advance=advance)
+        now_utc = fields.Datetime.now()
 
-        for wc in workcenters:
+        rows, changed = [], []
+        for wc in self:
             data = oee_results.get(wc.id, {})
             if not data or 'error' in data:
                 continue
+            mirror = {
+                'current_oee': data.get('oee', 0.0),
+                'current_availability': data.get('availability', 0.0),
+                'current_performance': data.get('performance', 0.0),
+                'current_quality': data.get('quality', 0.0),
+                'current_produced': data.get('total_produced', 0),
+                'current_waste_losses': data.get('waste_losses', 0.0),
+                'current_downtime_losses': data.get('downtime_losses', 0.0),
+                'current_first_running_time': data.get('first_running_time') or False,
+                'current_runtime_formatted': data.get('runtime_formatted', '00:00:00'),
+                'current_top_rejection': data.get('top_rejection', 'None'),
+                'current_top_alarm': data.get('top_alarm', 'None'),
+            }
+            if all(wc[f] == v for f, v in mirror.items()):
+                continue
+            rows.append((
+                now_utc.strftime('%Y-%m-%d %H:%M:%S'), wc.id,
+                data.get('oee', 0.0), data.get('availability', 0.0), data.get('performance', 0.0), data.get('quality', 0.0),
+                data.get('total_produced', 0), data.get('waste_losses', 0.0), data.get('downtime_losses', 0.0),
+                data.get('runtime_sec', 0.0), data.get('first_running_time') or None,
+                data.get('top_alarm_id'), data.get('top_alarm', 'None'), data.get('top_rejection', 'None')
+            ))
+            changed.append((wc, data, mirror))
+        if not rows:
+            return
 
-            vals = {}
-            if wc.current_oee != data.get('oee', 0.0): vals['current_oee'] = data.get('oee', 0.0)
-            if wc.current_availability != data.get('availability', 0.0): vals['current_availability'] = data.get('availability', 0.0)
-            if wc.current_performance != data.get('performance', 0.0): vals['current_performance'] = data.get('performance', 0.0)
-            if wc.current_quality != data.get('quality', 0.0): vals['current_quality'] = data.get('quality', 0.0)
-            if wc.current_produced != data.get('total_produced', 0): vals['current_produced'] = data.get('total_produced', 0)
-            if wc.current_waste_losses != data.get('waste_losses', 0.0): vals['current_waste_losses'] = data.get('waste_losses', 0.0)
-            if wc.current_downtime_losses != data.get('downtime_losses', 0.0): vals['current_downtime_losses'] = data.get('downtime_losses', 0.0)
-            if wc.current_first_running_time != data.get('first_running_time'): vals['current_first_running_time'] = data.get('first_running_time')
-            if wc.current_runtime_formatted != data.get('runtime_formatted', '00:00:00'): vals['current_runtime_formatted'] = data.get('runtime_formatted', '00:00:00')
-            if wc.current_top_rejection != data.get('top_rejection', 'None'): vals['current_top_rejection'] = data.get('top_rejection', 'None')
-            if wc.current_top_alarm != data.get('top_alarm', 'None'): vals['current_top_alarm'] = data.get('top_alarm', 'None')
-            if vals:
-                wc.write(vals)
+        with self.env['mes.timescale.base']._connection() as conn:
+            with conn.cursor() as cur:
+                psycopg2.extras.execute_values(cur, """
+                    WITH ins AS (
+                        INSERT INTO kpi_snapshot (time, workcenter_id, oee, availability, performance, quality, produced,
+                                                  waste_losses, downtime_losses, runtime_sec, first_running_time,
+                                                  top_alarm_id, top_alarm, top_rejection)
+                        SELECT v.ts::timestamp AT TIME ZONE 'UTC', v.wc_id, v.oee, v.avail, v.perf, v.qual, v.prod,
+                               v.waste, v.dt, v.run_sec, v.first_run::timestamp, v.alarm_id::integer, v.alarm, v.rej
+                        FROM (VALUES %s) AS v (ts, wc_id, oee, avail, perf, qual, prod, waste, dt, run_sec, first_run, alarm_id, alarm, rej)
+                        RETURNING *
+                    )
+                    INSERT INTO kpi_latest (id, workcenter_id, time, oee, availability, performance, quality, produced,
+                                            waste_losses, downtime_losses, runtime_sec, first_running_time,
+                                            top_alarm_id, top_alarm, top_rejection)
+                    SELECT workcenter_id, workcenter_id, time, oee, availability, performance, quality, produced,
+                           waste_losses, downtime_losses, runtime_sec, first_running_time,
+                           top_alarm_id, top_alarm, top_rejection
+                    FROM ins
+                    ON CONFLICT (id) DO UPDATE SET
+                        time = EXCLUDED.time, oee = EXCLUDED.oee, availability = EXCLUDED.availability,
+                        performance = EXCLUDED.performance, quality = EXCLUDED.quality, produced = EXCLUDED.produced,
+                        waste_losses = EXCLUDED.waste_losses, downtime_losses = EXCLUDED.downtime_losses,
+                        runtime_sec = EXCLUDED.runtime_sec, first_running_time = EXCLUDED.first_running_time,
+                        top_alarm_id = EXCLUDED.top_alarm_id, top_alarm = EXCLUDED.top_alarm,
+                        top_rejection = EXCLUDED.top_rejection
+                """, rows, page_size=1000)
+
+        for wc, _data, mirror in changed:
+            wc.write(mirror)
+        self.env['mes.kpi.latest.fdw'].invalidate_model()
+        self.env['bus.bus']._sendmany([
+            ('mes_kpi', 'mes_kpi/updated', {
+                'workcenter_id': wc.id,
+                'oee': data.get('oee', 0.0),
+                'produced': data.get('total_produced', 0),
+                'top_alarm': data.get('top_alarm', 'None')
+            }) for wc, data, _mirror in changed
+        ])
 
     def action_force_metrics_update(self):
         self.ensure_one()
-        oee_results = self.env['mes.machine.settings'].get_realtime_oee_batch(self)
-        
-        data = oee_results.get(self.id, {})
-        if not data or 'error' in data:
-            return
-
-        self.write({
-            'current_oee': data.get('oee', 0.0),
-            'current_availability': data.get('availability', 0.0),
-            'current_performance': data.get('performance', 0.0),
-            'current_quality': data.get('quality', 0.0),
-            'current_produced': data.get('total_produced', 0),
-            'current_waste_losses': data.get('waste_losses', 0.0),
-            'current_downtime_losses': data.get('downtime_losses', 0.0),
-            'current_first_running_time': data.get('first_running_time'),
-            'current_runtime_formatted': data.get('runtime_formatted', '00:00:00'),
-            'current_top_rejection': data.get('top_rejection', 'None'),
-            'current_top_alarm': data.get('top_alarm', 'None')
-        })
+        self._store_kpi_snapshots()
 
     def action_open_waste_losses(self):
         self.ensure_one()
@@ -434,6 +587,15 @@ class MesWorkcenter(models.Model):
             if wc.refresh_frequency < 10:
                 raise ValidationError('Configuration error: Refresh frequency cannot be less than 10 seconds.')
 
+    @api.model
+    def _get_process_tier(self, s_loc, e_loc):
+        rng_sec = (e_loc - s_loc).total_seconds()
+        if rng_sec > 7 * 86400:
+            return 'telemetry_process_hourly_stats', 3600
+        if rng_sec > 12 * 3600:
+            return 'telemetry_process_1m_stats', 60
+        return None
+
     @api.model
     def _build_chart_payload(self, wc, s_loc, calc_e_loc, s_utc, calc_e_utc, b_min, count_id=False, proc_id=False):
         mac = wc.machine_settings_id
@@ -500,23 +662,33 @@ class MesWorkcenter(models.Model):
                             idx = b_idx_map[key] + 1
                             if idx < len(prod_data): prod_data[idx] += qty
 
+                p_tier = self._get_process_tier(s_loc, calc_e_loc)
                 for p in p_to_fetch:
                     p_tag = p.get_tag_for_machine(mac)
                     if not p_tag: continue
-                    cur.execute("""
-                        SELECT time, value FROM (
-                            (SELECT time, value FROM telemetry_process
-                            WHERE machine_name = %s AND tag_name = %s AND time < %s
-                            ORDER BY time DESC LIMIT 1)
-                            UNION ALL
-                            (SELECT time, value FROM telemetry_process
-                            WHERE machine_name = %s AND tag_name = %s AND time >= %s AND time <= %s
-                            ORDER BY time ASC)
-                        ) sub ORDER BY time ASC
-                    """, (mac.name, p_tag, s_loc, mac.name, p_tag, s_loc, calc_e_loc))
+                    if p_tier:
+                        p_view, p_sec = p_tier
+                        cur.execute(f"""
+                            SELECT bucket, avg_val FROM {p_view}
+                            WHERE machine_name = %s AND tag_name = %s AND bucket > %s AND bucket <= %s
+                            ORDER BY bucket ASC
+                        """, (mac.name, p_tag, s_loc - timedelta(seconds=p_sec), calc_e_loc))
+                    else:
+                        cur.execute("""
+                            SELECT time, value FROM (
+                                (SELECT time, value FROM telemetry_process
+                                WHERE machine_name = %s AND tag_name = %s AND time < %s
+                                ORDER BY time DESC LIMIT 1)
+                                UNION ALL
+                                (SELECT time, value FROM telemetry_process
+                                WHERE machine_name = %s AND tag_name = %s AND time >= %s AND time <= %s
+                                ORDER BY time ASC)
+                            ) sub ORDER BY time ASC
+                        """, (mac.name, p_tag, s_loc, mac.name, p_tag, s_loc, calc_e_loc))
                     
                     p_series = []
                     for row in cur.fetchall():
+                        if row[1] is None: continue
                         p_series.append({'x': to_iso(row[0].replace(tzinfo=None)), 'y': float(row[1])})
                     if tgt_p and p.id == tgt_p.id: main_p_data = p_series
                     all_p_data.append({'name': p.complete_name or p.name, 'data': p_series})
@@ -667,7 +839,7 @@ class MesHistDashboardWiz(models.TransientModel):
         e_time_wall = e_utc.astimezone(local_tz).replace(tzinfo=None)
 
         res = self.env['mrp.workcenter']._build_chart_payload(
-            wiz.wc_id, s_time_wall, e_time_wall, wiz.b_min, 
+            wiz.wc_id, s_time_wall, e_time_wall, wiz.s_time, wiz.e_time, wiz.b_min, 
             wiz.count_id.id if wiz.count_id else False, 
             wiz.proc_id.id if wiz.proc_id else False
         )
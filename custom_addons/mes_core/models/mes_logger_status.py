@@ -26,4 +26,21 @@ class MrpWorkcenter(models.Model):
     log_odoo_send_dt = fields.Datetime(related='machine_settings_id.log_odoo_send_dt')
     
     log_err_msg = fields.Char(related='machine_settings_id.log_err_msg')
-    log_err_dt = fields.Datetime(related='machine_settings_id.log_err_dt')
\ No newline at end of file
+    log_err_dt = fields.Datetime(related='machine_settings_id.log_err_dt')
+
+    fsm_lag_sec = fields.Float(string="FSM Lag (sec)", compute='_compute_fsm_watermark')
+    fsm_synced_dt = fields.Datetime(string="FSM Last Sync", compute='_compute_fsm_watermark')
+
+    def _compute_fsm_watermark(self):
+        wm_map = {}
+        if self.ids:
+            self.env.cr.execute("""
+                SELECT machine_id, lag_sec, updated_at 
+                FROM mes_fsm_watermark WHERE machine_id IN %s
+            """, (tuple(self.ids),))
+            wm_map = {r[0]: r[1:] for r in self.env.cr.fetchall()}
+
+        for wc in self:
+            lag_sec, upd_dt = wm_map.get(wc.id, (0.0, False))
+            wc.fsm_lag_sec = lag_sec or 0.0
+            wc.fsm_synced_dt = upd_dt
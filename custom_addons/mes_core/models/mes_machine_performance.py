@@ -1,10 +1,15 @@
 import pytz
 import logging
 from datetime import datetime, timedelta, time
-from odoo import models, fields, api
+from odoo import models, fields, api, tools
+from odoo.addons.mes_core.tools.fsm_core import IntervalBuilder
+from odoo.addons.mes_core.tools.fsm_listener import start_listener
 
 _logger = logging.getLogger(__name__)
 
+MAX_EVT_ID = 9223372036854775807
+FSM_LOCK_NS = 4711
+
 class MesMachinePerformance(models.Model):
     _name = 'mes.machine.performance'
     _description = 'Machine Performance Data (OEE)'
@@ -17,6 +22,9 @@ class MesMachinePerformance(models.Model):
     machine_id = fields.Many2one('mrp.workcenter', string='Machine', required=True)
     company_id = fields.Many2one('res.company', string='Company', required=True, default=lambda self: self.env.company)
     state = fields.Selection([('draft', 'Draft'), ('done', 'Locked')], string='Status', default='draft', tracking=True)
+    suppressed_transitions = fields.Integer(string='Suppressed Transitions', default=0, readonly=True)
+    start_utc = fields.Datetime(string='Shift Start', compute='_compute_utc_window', store=True)
+    end_utc = fields.Datetime(string='Shift End', compute='_compute_utc_window', store=True)
 
     alarm_ids = fields.One2many('mes.performance.alarm', 'performance_id', string='Alarms')
     running_ids = fields.One2many('mes.performance.running', 'performance_id', string='Running Logs')
@@ -44,20 +52,109 @@ class MesMachinePerformance(models.Model):
 
     @api.model
     def cron_process_pending_events(self):
+        start_listener(self.env.cr.dbname)
         workcenters = self.env['mrp.workcenter'].search([('machine_settings_id', '!=', False)])
+        self._enqueue_fsm_jobs(workcenters)
+
+    @api.model
+    def enqueue_fsm_for_machines(self, mac_names):
+        workcenters = self.env['mrp.workcenter'].search([('machine_settings_id.name', 'in', mac_names)])
+        self._enqueue_fsm_jobs(workcenters)
+
+    @api.model
+    def _enqueue_fsm_jobs(self, workcenters):
         for wc in workcenters:
-            try:
-                self._sync_machine_fsm(wc)
-            except Exception as e:
-                _logger.error("CRON FSM FAULT | WC: %s | Err: %s", wc.name, str(e))
+            self.with_delay(
+                channel='root.mes_fsm',
+                description=f"FSM Sync {wc.name}",
+                priority=5,
+                identity_key=f"mes_fsm_{wc.id}"
+            ).action_sync_machine_fsm_job(wc.id)
+
+    def action_sync_machine_fsm_job(self, wc_id):
+        wc = self.env['mrp.workcenter'].browse(wc_id).exists()
+        if not wc or not wc.machine_settings_id:
+            return
 
-    def _sync_machine_fsm(self, wc):
-        self.env.flush_all()
+        self.env.cr.execute("SELECT pg_try_advisory_lock(%s, %s)", (FSM_LOCK_NS, wc.id))
+        if not self.env.cr.fetchone()[0]:
+            _logger.info("FSM SYNC | WC: %s | already running, skipping", wc.name)
+            return
+
+        try:
+            self._sync_machine_fsm(wc)
+        except Exception:
+            self.env.cr.rollback()
+            raise
+        finally:
+            self.env.cr.execute("SELECT pg_advisory_unlock(%s, %s)", (FSM_LOCK_NS, wc.id))
+
+    @api.depends('date', 'shift_id.start_hour', 'shift_id.duration', 'company_id.tz')
+    def _compute_utc_window(self):
+        for doc in self:
+            if not doc.date or not doc.shift_id:
+                doc.start_utc = doc.end_utc = False
+                continue
+            s_loc, e_loc = doc._get_local_shift_times()
+            doc.start_utc = doc._get_utc_time(s_loc)
+            doc.end_utc = doc._get_utc_time(e_loc)
+
+    def _ensure_interval_index(self, table):
+        self.env.cr.execute("CREATE EXTENSION IF NOT EXISTS btree_gist")
+        self.env.cr.execute("""
+            CREATE OR REPLACE FUNCTION mes_interval_range(s TIMESTAMP, e TIMESTAMP) RETURNS TSRANGE
+            LANGUAGE sql IMMUTABLE AS $$ SELECT tsrange(s, CASE WHEN e < s THEN s ELSE e END) $$
+        """)
+        self.env.cr.execute("""
+            CREATE INDEX IF NOT EXISTS %s_machine_range_gist
+            ON %s USING gist (machine_id, mes_interval_range(start_time, end_time))
+        """ % (table, table))
+
+    def init(self):
+        self.env.cr.execute("""
+            CREATE INDEX IF NOT EXISTS mes_machine_performance_utc_window_idx
+            ON mes_machine_performance (machine_id, state, start_utc, end_utc)
+        """)
+        self.env.cr.execute("""
+            CREATE TABLE IF NOT EXISTS mes_fsm_watermark (
+                machine_id INTEGER PRIMARY KEY REFERENCES mrp_workcenter(id) ON DELETE CASCADE,
+                last_time TIMESTAMPTZ,
+                last_event_id BIGINT NOT NULL DEFAULT 0,
+                last_reason INTEGER,
+                lag_sec DOUBLE PRECISION,
+                updated_at TIMESTAMP
+            )
+        """)
+        self.env.cr.execute("ALTER TABLE mes_fsm_watermark ADD COLUMN IF NOT EXISTS seen_event_id BIGINT")
+        self.env.cr.execute("ALTER TABLE mes_fsm_watermark ADD COLUMN IF NOT EXISTS seen_event_ids BIGINT[]")
+
+    def _get_fsm_watermark(self, wc):
+        self.env.cr.execute("""
+            SELECT last_time, last_event_id, last_reason, seen_event_id, seen_event_ids
+            FROM mes_fsm_watermark WHERE machine_id = %s
+        """, (wc.id,))
+        return self.env.cr.fetchone()
+
+    def _set_fsm_watermark(self, wc, last_ts, last_id, last_reason, lag_sec, seen_id=None, seen_ids=None):
+        self.env.cr.execute("""
+            INSERT INTO mes_fsm_watermark (machine_id, last_time, last_event_id, last_reason, lag_sec, seen_event_id, seen_event_ids, updated_at)
+            VALUES (%s, %s, %s, %s, %s, %s, %s::BIGINT[], now() AT TIME ZONE 'UTC')
+            ON CONFLICT (machine_id) DO UPDATE SET
+                last_time = EXCLUDED.last_time,
+                last_event_id = EXCLUDED.last_event_id,
+                last_reason = EXCLUDED.last_reason,
+                lag_sec = EXCLUDED.lag_sec,
+                seen_event_id = COALESCE(EXCLUDED.seen_event_id, mes_fsm_watermark.seen_event_id),
+                seen_event_ids = COALESCE(EXCLUDED.seen_event_ids, mes_fsm_watermark.seen_event_ids),
+                updated_at = EXCLUDED.updated_at
+        """, (wc.id, last_ts, last_id, last_reason, lag_sec, seen_id, seen_ids))
+
+    def _get_active_state(self, wc):
         open_states = []
         
         for model in ['mes.performance.running', 'mes.performance.alarm', 'mes.performance.slowing']:
             records = self.env[model].search([
-                ('performance_id.machine_id', '=', wc.id),
+                ('machine_id', '=', wc.id),
                 ('end_time', '=', False)
             ])
             open_states.extend(records)
@@ -69,42 +166,184 @@ class MesMachinePerformance(models.Model):
             
             for orphan in open_states[1:]:
                 orphan.write({'end_time': active_state.start_time})
+        return active_state
 
-        last_utc_ts = active_state.start_time if active_state else (fields.Datetime.now() - timedelta(days=1))
-        
-        tz_name = wc.company_id.tz or 'UTC'
-        local_tz = pytz.timezone(tz_name)
-        last_local_ts = pytz.utc.localize(last_utc_ts).astimezone(local_tz).replace(tzinfo=None)
-        
+    def _get_prev_state(self, wc, active_state):
+        if not active_state or not (wc.fsm_min_state_sec or wc.fsm_hysteresis_sec):
+            return None
+        for model in ['mes.performance.running', 'mes.performance.alarm', 'mes.performance.slowing']:
+            prev = self.env[model].search([
+                ('machine_id', '=', wc.id),
+                ('end_time', '=', active_state.start_time)
+            ], order='start_time desc', limit=1)
+            if prev:
+                return prev
+        return None
+
+    def _check_late_events(self, wc, wm, overlap, late_win):
         mac = wc.machine_settings_id
-        
-        last_reason_val = 0
-        if wc.telemetry_state_logic == 'states':
-            with self.env['mes.timescale.base']._connection() as conn:
-                with conn.cursor() as cur:
+        prev_id = wm[3] if wm and wm[3] is not None else None
+        prev_ids = wm[4] if wm else None
+        local_tz = pytz.timezone(wc.company_id.tz or 'UTC')
+        since_utc = fields.Datetime.now() - timedelta(hours=late_win)
+        since_ts = pytz.utc.localize(since_utc).astimezone(local_tz).replace(tzinfo=None).strftime('%Y-%m-%d %H:%M:%S.%f')
+
+        with self.env['mes.timescale.base']._connection() as conn:
+            with conn.cursor() as cur:
+                if prev_id is None:
+                    cur.execute("SELECT COALESCE(max(id), 0) FROM telemetry_event_raw")
+                    lo_id = max(cur.fetchone()[0] - overlap, 0)
+                else:
+                    lo_id = max(prev_id - overlap, 0)
+
+                cur.execute("""
+                    SELECT id FROM telemetry_event 
+                    WHERE machine_name = %s AND time >= %s AND id > %s
+                """, (mac.name, since_ts, lo_id))
+                ids = [r[0] for r in cur.fetchall()]
+                seen_id = max(ids + [prev_id or lo_id])
+                seen_ids = [i for i in ids if i > seen_id - overlap]
+
+                late_ts = None
+                if wm and wm[0] and prev_id is not None:
                     cur.execute("""
-                        SELECT value FROM telemetry_event 
-                        WHERE machine_name = %s AND tag_name = 'OEE.nStopRootReason' AND time <= %s
-                        ORDER BY time DESC LIMIT 1
-                    """, (mac.name, last_local_ts.strftime('%Y-%m-%d %H:%M:%S.%f')))
-                    res = cur.fetchone()
-                    if res: last_reason_val = res[0]
+                        SELECT min(time) FROM telemetry_event 
+                        WHERE machine_name = %s AND time >= %s AND id > %s AND id <> ALL(%s::BIGINT[]) AND (time, id) <= (%s, %s)
+                    """, (mac.name, since_ts, lo_id if prev_ids is not None else prev_id, prev_ids or [], wm[0], wm[1]))
+                    late_ts = cur.fetchone()[0]
+        return seen_id, seen_ids, late_ts
+
+    def _rewind_fsm(self, wc, late_utc):
+        models = ['mes.performance.running', 'mes.performance.alarm', 'mes.performance.slowing']
+        base_dom = [('machine_id', '=', wc.id)]
+
+        rewind_utc = late_utc
+        for model in models:
+            covering = self.env[model].search(base_dom + [
+                ('start_time', '<=', late_utc),
+                '|', ('end_time', '=', False), ('end_time', '>', late_utc)
+            ], order='start_time desc', limit=1)
+            if covering and covering.start_time < rewind_utc:
+                rewind_utc = covering.start_time
+
+        stale = [self.env[model].search(base_dom + [('start_time', '>=', rewind_utc)]) for model in models]
+        if any(recs.filtered(lambda r: r.performance_id.state == 'done') for recs in stale):
+            return None
+
+        for recs in stale:
+            recs.unlink()
+        for model in models:
+            self.env[model].search(base_dom + [('end_time', '=', rewind_utc)]).write({'end_time': False})
+        self.env['mes.oee.accumulator'].reset([wc.id])
+        return rewind_utc
+
+    def _sync_machine_fsm(self, wc):
+        self.env.flush_all()
+        local_tz = pytz.timezone(wc.company_id.tz or 'UTC')
+        mac = wc.machine_settings_id
+
+        params = self.env['ir.config_parameter'].sudo()
+        b_size = int(params.get_param('mes_core.fsm_batch_size', 5000))
+        max_b = int(params.get_param('mes_core.fsm_max_batches', 50))
+        late_win = int(params.get_param('mes_core.fsm_late_window_hours', 48))
+        late_overlap = int(params.get_param('mes_core.fsm_late_overlap', 1000))
+
+        wm = self._get_fsm_watermark(wc)
+        seen_id, seen_ids, late_ts = self._check_late_events(wc, wm, late_overlap, late_win)
+        if late_ts:
+            late_utc = local_tz.localize(late_ts.replace(tzinfo=None)).astimezone(pytz.utc).replace(tzinfo=None)
+            rewind_utc = None
+            if late_utc >= fields.Datetime.now() - timedelta(hours=late_win):
+                rewind_utc = self._rewind_fsm(wc, late_utc)
+            if rewind_utc:
+                _logger.info("FSM LATE DATA | WC: %s | recomputing from %s", wc.name, rewind_utc)
+                self.env.flush_all()
+                rewind_ts = pytz.utc.localize(rewind_utc).astimezone(local_tz).replace(tzinfo=None).strftime('%Y-%m-%d %H:%M:%S.%f')
+                rewind_reason = self._fetch_last_reason(mac, rewind_ts) if wc.telemetry_state_logic == 'states' else 0
+                wm = (rewind_ts, 0, rewind_reason, seen_id, seen_ids)
+            else:
+                _logger.warning("FSM LATE DATA | WC: %s | events from %s are outside the recompute window, regenerate history to include them", wc.name, late_utc)
 
+        active_state = self._get_active_state(wc)
+        builder = IntervalBuilder.from_record(
+            active_state, self._get_prev_state(wc, active_state),
+            wc.fsm_min_state_sec, wc.fsm_hysteresis_sec
+        )
+        doc_cache = {}
+
+        if wm and wm[0]:
+            last_ts, last_id, last_reason_val = wm[0], wm[1], wm[2] or 0
+        else:
+            last_utc_ts = active_state.start_time if active_state else (fields.Datetime.now() - timedelta(days=1))
+            last_ts = pytz.utc.localize(last_utc_ts).astimezone(local_tz).replace(tzinfo=None).strftime('%Y-%m-%d %H:%M:%S.%f')
+            last_id = MAX_EVT_ID
+            last_reason_val = 0
+            if wc.telemetry_state_logic == 'states':
+                last_reason_val = self._fetch_last_reason(mac, last_ts)
+
+        with self.env['mes.timescale.base']._connection() as conn:
+            with conn.cursor() as cur:
+                for _b in range(max_b):
+                    cur.execute("""
+                        SELECT id, time, tag_name, value 
+                        FROM telemetry_event 
+                        WHERE machine_name = %s AND time >= %s AND (time, id) > (%s, %s) AND id <= %s
+                        ORDER BY time, id LIMIT %s
+                    """, (mac.name, last_ts, last_ts, last_id, seen_id, b_size))
+                    rows = cur.fetchall()
+                    if not rows:
+                        break
+
+                    last_reason_val = self._apply_fsm_rows(wc, rows, builder, last_reason_val, doc_cache)
+                    builder.flush(self.env)
+                    last_id, last_ts = rows[-1][0], rows[-1][1]
+
+                    self._set_fsm_watermark(wc, last_ts, last_id, last_reason_val, None, seen_id, seen_ids)
+                    self.env.cr.commit()
+
+                    if len(rows) < b_size:
+                        break
+
+                cur.execute("SELECT max(time) FROM telemetry_event WHERE machine_name = %s", (mac.name,))
+                head_ts = cur.fetchone()[0]
+
+        if isinstance(last_ts, datetime):
+            lag_sec = max((head_ts - last_ts).total_seconds(), 0.0) if head_ts else 0.0
+            self._set_fsm_watermark(wc, last_ts, last_id, last_reason_val, lag_sec, seen_id, seen_ids)
+            if lag_sec:
+                _logger.info("FSM LAG | WC: %s | %.0f sec behind", wc.name, lag_sec)
+
+    def _fetch_last_reason(self, mac, local_ts):
         with self.env['mes.timescale.base']._connection() as conn:
             with conn.cursor() as cur:
                 cur.execute("""
-                    SELECT time, tag_name, value 
-                    FROM telemetry_event 
-                    WHERE machine_name = %s AND time > %s
-                    ORDER BY time ASC LIMIT 5000
-                """, (mac.name, last_local_ts.strftime('%Y-%m-%d %H:%M:%S.%f')))
-                rows = cur.fetchall()
-
-        if not rows:
-            return
+                    SELECT value FROM telemetry_event 
+                    WHERE machine_name = %s AND tag_name = 'OEE.nStopRootReason' AND time <= %s
+                    ORDER BY time DESC LIMIT 1
+                """, (mac.name, local_ts))
+                res = cur.fetchone()
+        return res[0] if res else 0
+
+    def _apply_fsm_rows(self, wc, rows, builder, last_reason_val, doc_cache=None):
+        local_tz = pytz.timezone(wc.company_id.tz or 'UTC')
+        mac = wc.machine_settings_id
+        trans_memo, reason_memo = {}, {}
+
+        def _classify(tag, val):
+            key = (tag, val)
+            if key not in trans_memo:
+                trans_memo[key] = self.classify_fsm_transition(wc, tag, val)
+            return trans_memo[key]
+
+        def _reason_id(val):
+            r_val = int(val) if val is not None else 0
+            if r_val not in reason_memo:
+                evt = self._resolve_event(mac, 'OEE.nStopRootReason', r_val)
+                reason_memo[r_val] = evt.id if evt else None
+            return reason_memo[r_val]
 
         for row in rows:
-            ts_raw, tag, val = row
+            _evt_pk, ts_raw, tag, val = row
             
             if isinstance(ts_raw, str):
                 evt_dt = fields.Datetime.to_datetime(ts_raw.replace('T', ' ').replace('Z', '')[:19])
@@ -112,16 +351,13 @@ class MesMachinePerformance(models.Model):
                 evt_dt = ts_raw.replace(tzinfo=None)
                 
             evt_utc = local_tz.localize(evt_dt).astimezone(pytz.utc).replace(tzinfo=None)
-            
-            if active_state and evt_utc <= active_state.start_time:
-                continue
 
             if wc.telemetry_state_logic == 'states':
                 if tag == 'OEE.nStopRootReason':
                     last_reason_val = val
-                    if active_state and active_state._name == 'mes.performance.alarm':
-                        evt = self._resolve_event(mac, tag, int(val) if val is not None else 0)
-                        if evt: active_state.write({'loss_id': evt.id})
+                    if builder.active and builder.active['model'] == 'mes.performance.alarm':
+                        evt_id = _reason_id(val)
+                        if evt_id: builder.set_loss(evt_id)
                     continue
                 
                 if tag != 'OEE.nMachineState':
@@ -130,31 +366,62 @@ class MesMachinePerformance(models.Model):
                 plc_val = int(val) if val is not None else 0
                 if plc_val == 1:
                     tgt_model = 'mes.performance.alarm'
-                    evt = self._resolve_event(mac, 'OEE.nStopRootReason', int(last_reason_val) if last_reason_val is not None else 0)
-                    evt_id = evt.id if evt else None
+                    evt_id = _reason_id(last_reason_val)
                 else:
-                    tgt_model, evt_id = self.classify_fsm_transition(wc, tag, val)
+                    tgt_model, evt_id = _classify(tag, val)
             else:
-                tgt_model, evt_id = self.classify_fsm_transition(wc, tag, val)
+                tgt_model, evt_id = _classify(tag, val)
 
             if not tgt_model or not evt_id:
                 continue
 
-            if active_state and active_state._name == tgt_model and active_state.loss_id.id == evt_id:
+            if builder.is_same(tgt_model, evt_id):
                 continue
 
-            if active_state:
-                active_state.write({'end_time': evt_utc})
-
-            perf_doc = self._get_or_create_doc(wc, evt_utc)
+            perf_doc = self._get_or_create_doc(wc, evt_utc, doc_cache)
             if not perf_doc:
+                builder.close(evt_utc)
                 continue
 
-            active_state = self.env[tgt_model].create({
-                'performance_id': perf_doc.id,
-                'loss_id': evt_id,
-                'start_time': evt_utc
-            })
+            builder.transition(tgt_model, evt_id, evt_utc, perf_doc.id)
+
+        return last_reason_val
+
+    @api.model
+    @tools.ormcache()
+    def _get_default_event_map(self):
+        res = {}
+        for evt in self.env['mes.event'].sudo().search([('default_event_tag_type', '!=', False)]):
+            res.setdefault((evt.default_event_tag_type, evt.default_plc_value), evt.id)
+        return res
+
+    @api.model
+    @tools.ormcache('mac_id')
+    def _get_signal_event_map(self, mac_id):
+        res = {}
+        for sig in self.env['mes.signal.event'].sudo().search([('machine_id', '=', mac_id)], order='id'):
+            res.setdefault((sig.tag_name, sig.plc_value), sig.event_id.id)
+        return res
+
+    @api.model
+    @tools.ormcache('wc_id')
+    def _get_fsm_rules(self, wc_id):
+        wc = self.env['mrp.workcenter'].sudo().browse(wc_id)
+        mac = wc.machine_settings_id
+
+        run_key = None
+        if wc.runtime_event_id:
+            run_sig = mac.event_tag_ids.filtered(lambda x: x.event_id == wc.runtime_event_id)
+            if run_sig:
+                run_key = (run_sig[0].tag_name, run_sig[0].plc_value)
+            else:
+                run_key = (wc.runtime_event_id.default_event_tag_type, wc.runtime_event_id.default_plc_value)
+
+        stop_tag = mac.get_alarm_tag_name('OEE.nStopRootReason').replace('%', '') if mac else 'OEE.nStopRootReason'
+        return {
+            'run_key': run_key,
+            'stop_tags': frozenset({stop_tag, 'OEE.nStopRootReason'}),
+        }
 
     @api.model
     def classify_fsm_transition(self, wc, tag, val):
@@ -165,32 +432,20 @@ class MesMachinePerformance(models.Model):
         if not evt:
             return None, None
 
-        is_run = False
-        if wc.runtime_event_id:
-            run_sig = mac.event_tag_ids.filtered(lambda x: x.event_id == wc.runtime_event_id)
-            if run_sig:
-                is_run = (run_sig[0].tag_name == tag and run_sig[0].plc_value == plc_val)
-            else:
-                is_run = (wc.runtime_event_id.default_event_tag_type == tag and wc.runtime_event_id.default_plc_value == plc_val)
-        
-        if is_run:
+        rules = self._get_fsm_rules(wc.id)
+        if (tag, plc_val) == rules['run_key']:
             return 'mes.performance.running', evt.id
 
-        stop_tag = mac.get_alarm_tag_name('OEE.nStopRootReason').replace('%', '')
-        if tag == stop_tag or tag == 'OEE.nStopRootReason':
+        if tag in rules['stop_tags']:
             return 'mes.performance.alarm', evt.id
 
         return 'mes.performance.slowing', evt.id
 
     @api.model
     def _resolve_event(self, mac, tag, val):
-        sig = self.env['mes.signal.event'].search([('machine_id', '=', mac.id), ('tag_name', '=', tag), ('plc_value', '=', val)], limit=1)
-        if sig: 
-            return sig.event_id
-            
-        evt = self.env['mes.event'].search([('default_event_tag_type', '=', tag), ('default_plc_value', '=', val)], limit=1)
-        if evt: 
-            return evt
+        evt_id = self._get_signal_event_map(mac.id).get((tag, val)) or self._get_default_event_map().get((tag, val))
+        if evt_id:
+            return self.env['mes.event'].browse(evt_id)
             
         grp = self.env['mes.event'].search([('name', '=', 'Unknown'), ('parent_id', '=', False)], limit=1)
         if not grp: 
@@ -203,32 +458,24 @@ class MesMachinePerformance(models.Model):
             'default_plc_value': val
         })
 
-    def _get_or_create_doc(self, wc, ts_utc):
-        mac_tz = pytz.timezone(wc.company_id.tz or 'UTC')
-        ts_loc = pytz.utc.localize(ts_utc).astimezone(mac_tz).replace(tzinfo=None)
-        
-        curr_h = ts_loc.hour + ts_loc.minute / 60.0 + ts_loc.second / 3600.0
-        shifts = self.env['mes.shift'].search([('company_id', '=', wc.company_id.id)])
-        val_s = [s for s in shifts if not (s.workcenter_ids and wc.id not in s.workcenter_ids.ids)]
-        
-        cur_s = None
-        for s in val_s:
-            if (s.start_hour < s.end_hour and s.start_hour <= curr_h < s.end_hour) or \
-               (s.start_hour >= s.end_hour and (curr_h >= s.start_hour or curr_h < s.end_hour)):
-                cur_s = s
-                break
-
-        if not cur_s:
+    def _get_or_create_doc(self, wc, ts_utc, cache=None):
+        cache = {} if cache is None else cache
+        inst = cache.get('inst')
+        if not inst or not (inst.start_utc <= ts_utc < inst.end_utc):
+            inst = self.env['mes.shift.instance']._locate(wc, ts_utc)
+            cache['inst'] = inst
+        if not inst:
             return None
-            
-        st_d = ts_loc.date()
-        if cur_s.start_hour > cur_s.end_hour and curr_h < cur_s.end_hour:
-            st_d -= timedelta(days=1)
-            
-        doc = self.search([('machine_id', '=', wc.id), ('shift_id', '=', cur_s.id), ('date', '=', st_d)], limit=1)
+
+        doc_key = (inst.shift_id.id, inst.date)
+        if doc_key in cache:
+            return cache[doc_key]
+
+        doc = self.search([('machine_id', '=', wc.id), ('shift_id', '=', inst.shift_id.id), ('date', '=', inst.date)], limit=1)
         
         if not doc:
-            doc = self.create({'machine_id': wc.id, 'shift_id': cur_s.id, 'date': st_d})
+            doc = self.create({'machine_id': wc.id, 'shift_id': inst.shift_id.id, 'date': inst.date})
+        cache[doc_key] = doc
         return doc
 
     def _get_local_shift_times(self):
@@ -252,6 +499,7 @@ class MesPerformanceAlarm(models.Model):
     _description = 'Machine Alarms'
 
     performance_id = fields.Many2one('mes.machine.performance', string='Report', ondelete='cascade', required=True)
+    machine_id = fields.Many2one('mrp.workcenter', related='performance_id.machine_id', store=True, index=True)
     loss_id = fields.Many2one('mes.event', string='Alarm Reason', required=True)
     start_time = fields.Datetime(string='Start Time')
     end_time = fields.Datetime(string='End Time')
@@ -267,11 +515,15 @@ class MesPerformanceAlarm(models.Model):
             else:
                 rec.duration = 0.0
 
+    def init(self):
+        self.env['mes.machine.performance']._ensure_interval_index(self._table)
+
 class MesPerformanceRunning(models.Model):
     _name = 'mes.performance.running'
     _description = 'Machine Runnings'
 
     performance_id = fields.Many2one('mes.machine.performance', string='Report', ondelete='cascade', required=True)
+    machine_id = fields.Many2one('mrp.workcenter', related='performance_id.machine_id', store=True, index=True)
     loss_id = fields.Many2one('mes.event', string='Activity Type', required=True) 
     start_time = fields.Datetime(string='Start Time')
     end_time = fields.Datetime(string='End Time')
@@ -287,11 +539,15 @@ class MesPerformanceRunning(models.Model):
             else:
                 rec.duration = 0.0
 
+    def init(self):
+        self.env['mes.machine.performance']._ensure_interval_index(self._table)
+
 class MesPerformanceSlowing(models.Model):
     _name = 'mes.performance.slowing'
     _description = 'Machine Slowing Logs'
 
     performance_id = fields.Many2one('mes.machine.performance', string='Report', ondelete='cascade', required=True)
+    machine_id = fields.Many2one('mrp.workcenter', related='performance_id.machine_id', store=True, index=True)
     loss_id = fields.Many2one('mes.event', string='Slowing Reason') 
     start_time = fields.Datetime(string='Start Time')
     end_time = fields.Datetime(string='End Time')
@@ -307,6 +563,9 @@ class MesPerformanceSlowing(models.Model):
             else:
                 rec.duration = 0.0
 
+    def init(self):
+        self.env['mes.machine.performance']._ensure_interval_index(self._table)
+
 class MesPerformanceRejection(models.Model):
     _name = 'mes.performance.rejection'
     _description = 'Machine Rejections'
@@ -1,7 +1,8 @@
 import pytz
 import logging
 from datetime import datetime, timedelta
-from odoo import models, fields, api
+from odoo import models, fields, api, tools
+from odoo.addons.mes_core.tools.interval_set import IntervalSet
 
 _logger = logging.getLogger(__name__)
 
@@ -45,6 +46,45 @@ class MesMachineSettings(models.Model):
     def _sync_fdw(self, rec):
         self._execute_from_file('upsert_machine.sql', (rec.name, rec.ip_connection, rec.ip_data))
 
+    @api.model
+    @tools.ormcache('mac_id')
+    def _get_signal_map(self, mac_id):
+        self.env.cr.execute("""
+            SELECT 'count', c.id, CASE WHEN s.id IS NULL THEN c."default_OPCTag" ELSE s.tag_name END,
+                   CASE WHEN s.id IS NULL THEN c.is_cumulative ELSE s.is_cumulative END, NULL::INTEGER
+            FROM mes_counts c
+            LEFT JOIN LATERAL (
+                SELECT id, tag_name, is_cumulative FROM mes_signal_count
+                WHERE count_id = c.id AND machine_id = %(mac)s ORDER BY id LIMIT 1
+            ) s ON TRUE
+            UNION ALL
+            SELECT 'event', e.id, CASE WHEN s.id IS NULL THEN e.default_event_tag_type ELSE s.tag_name END,
+                   NULL::BOOLEAN, CASE WHEN s.id IS NULL THEN e.default_plc_value ELSE s.plc_value END
+            FROM mes_event e
+            LEFT JOIN LATERAL (
+                SELECT id, tag_name, plc_value FROM mes_signal_event
+                WHERE event_id = e.id AND machine_id = %(mac)s ORDER BY id LIMIT 1
+            ) s ON TRUE
+            UNION ALL
+            SELECT 'process', p.id, CASE WHEN s.id IS NULL THEN p."default_OPCTag" ELSE s.tag_name END,
+                   NULL::BOOLEAN, NULL::INTEGER
+            FROM mes_process p
+            LEFT JOIN LATERAL (
+                SELECT id, tag_name FROM mes_signal_process
+                WHERE process_id = p.id AND machine_id = %(mac)s ORDER BY id LIMIT 1
+            ) s ON TRUE
+        """, {'mac': mac_id or 0})
+
+        res = {'count': {}, 'event': {}, 'process': {}}
+        for kind, rec_id, tag, is_cum, plc in self.env.cr.fetchall():
+            if kind == 'count':
+                res[kind][rec_id] = (tag or False, bool(is_cum))
+            elif kind == 'event':
+                res[kind][rec_id] = (tag or False, plc)
+            else:
+                res[kind][rec_id] = tag or False
+        return res
+
     def get_alarm_tag_name(self, default_type='OEE.nStopRootReason'):
         self.ensure_one()
         override = self.env['mes.signal.event'].search([
@@ -66,45 +106,35 @@ class MesMachineSettings(models.Model):
         dict_event = self.env['mes.event'].search([('default_plc_value', '=', plc_int)], limit=1)
         return dict_event.name if dict_event else plc_str
 
-    def _build_intersection_sql(self, active_intervals_utc, tbl_name):
-        val_list = [f"('{s.isoformat()}'::timestamp, '{e.isoformat()}'::timestamp)" for s, e in active_intervals_utc]
-        active_cte = "SELECT * FROM (VALUES " + ", ".join(val_list) + ") AS ai(ai_start, ai_end)"
+    def _to_multirange(self, active_intervals_utc):
+        return "{" + ",".join(f'["{st:%Y-%m-%d %H:%M:%S.%f}","{en:%Y-%m-%d %H:%M:%S.%f}")' for st, en in active_intervals_utc) + "}"
 
+    def _build_intersection_sql(self, tbl_name):
         return f"""
-            WITH active_windows AS ( {active_cte} ),
-            target_events AS (
-                SELECT e.id, e.loss_id, e.start_time, COALESCE(e.end_time, %s) as end_time
+            WITH target_events AS (
+                SELECT e.id, e.loss_id,
+                       tsmultirange(mes_interval_range(e.start_time, COALESCE(e.end_time, %(now)s))) * %(windows)s::tsmultirange as eff
                 FROM {tbl_name} e
-                JOIN mes_machine_performance p ON p.id = e.performance_id
-                WHERE p.machine_id = %s 
-                  AND p.date >= %s
-                  AND e.start_time < %s 
-                  AND (e.end_time > %s OR e.end_time IS NULL)
+                WHERE e.machine_id = %(wc_id)s
+                  AND mes_interval_range(e.start_time, e.end_time) && %(windows)s::tsmultirange
             ),
             intersected AS (
-                SELECT e.id, e.loss_id,
-                       GREATEST(e.start_time, aw.ai_start) as eff_start,
-                       LEAST(e.end_time, aw.ai_end) as eff_end
-                FROM target_events e
-                INNER JOIN active_windows aw ON aw.ai_start < e.end_time AND aw.ai_end > e.start_time
+                SELECT t.id, t.loss_id, lower(r) as eff_start, upper(r) as eff_end
+                FROM target_events t, unnest(t.eff) r
             )
         """
 
+    def _intersection_params(self, active_intervals_utc, wc_id):
+        return {'now': fields.Datetime.now(), 'windows': self._to_multirange(active_intervals_utc), 'wc_id': wc_id}
+
     def get_top_alarm_str(self, active_intervals_utc, wc_id):
         if not active_intervals_utc: return "None"
-        now_utc = fields.Datetime.now()
-        start_utc, end_utc = active_intervals_utc[0][0], active_intervals_utc[-1][1]
-        
-        wc = self.env['mrp.workcenter'].browse(wc_id)
-        mac_tz = pytz.timezone(wc.company_id.tz or 'UTC')
-        start_local = pytz.utc.localize(start_utc).astimezone(mac_tz).replace(tzinfo=None)
-        min_doc_date = (start_local - timedelta(days=1)).date()
 
-        query = self._build_intersection_sql(active_intervals_utc, 'mes_performance_alarm') + """
+        query = self._build_intersection_sql('mes_performance_alarm') + """
             SELECT loss_id, SUM(EXTRACT(EPOCH FROM (eff_end - eff_start))) as total_dur 
             FROM intersected WHERE eff_start < eff_end GROUP BY loss_id ORDER BY total_dur DESC LIMIT 1;
         """
-        self.env.cr.execute(query, (now_utc, wc_id, min_doc_date, end_utc, start_utc))
+        self.env.cr.execute(query, self._intersection_params(active_intervals_utc, wc_id))
         res = self.env.cr.fetchone()
         
         if res and res[0]:
@@ -116,14 +146,6 @@ class MesMachineSettings(models.Model):
         if not active_intervals_utc:
             return [] if mode == 'downtime' else False if mode == 'first_start' else 0.0
 
-        now_utc = fields.Datetime.now()
-        start_utc, end_utc = active_intervals_utc[0][0], active_intervals_utc[-1][1]
-        
-        wc = self.env['mrp.workcenter'].browse(wc_id)
-        mac_tz = pytz.timezone(wc.company_id.tz or 'UTC')
-        start_local = pytz.utc.localize(start_utc).astimezone(mac_tz).replace(tzinfo=None)
-        min_doc_date = (start_local - timedelta(days=1)).date()
-
         table_map = {
             'runtime': 'mes_performance_running',
             'downtime': 'mes_performance_alarm',
@@ -131,22 +153,86 @@ class MesMachineSettings(models.Model):
             'first_start': 'mes_performance_running'
         }
         
-        base_query = self._build_intersection_sql(active_intervals_utc, table_map.get(mode))
+        base_query = self._build_intersection_sql(table_map.get(mode))
+        params = self._intersection_params(active_intervals_utc, wc_id)
 
         if mode == 'runtime':
             query = base_query + "SELECT COALESCE(SUM(EXTRACT(EPOCH FROM (eff_end - eff_start))), 0) FROM intersected WHERE eff_start < eff_end"
-            self.env.cr.execute(query, (now_utc, wc_id, min_doc_date, end_utc, start_utc))
+            self.env.cr.execute(query, params)
             return float(self.env.cr.fetchone()[0] or 0.0)
         elif mode == 'downtime':
             query = base_query + "SELECT loss_id, COUNT(DISTINCT id) as freq, COALESCE(SUM(EXTRACT(EPOCH FROM (eff_end - eff_start))), 0) as total_dur FROM intersected WHERE eff_start < eff_end GROUP BY loss_id"
-            self.env.cr.execute(query, (now_utc, wc_id, min_doc_date, end_utc, start_utc))
+            self.env.cr.execute(query, params)
             return self.env.cr.fetchall()
         elif mode == 'first_start':
             query = base_query + "SELECT MIN(eff_start) FROM intersected WHERE eff_start < eff_end"
-            self.env.cr.execute(query, (now_utc, wc_id, min_doc_date, end_utc, start_utc))
+            self.env.cr.execute(query, params)
             res = self.env.cr.fetchone()
             return res[0] if res else False
 
+    @api.model
+    def _fetch_batch_interval_kpis(self, cfgs):
+        wc_ids, starts, ends = [], [], []
+        for wc_id, cfg in cfgs.items():
+            for s_utc, e_utc in cfg['act_ints_utc']:
+                wc_ids.append(wc_id)
+                starts.append(s_utc)
+                ends.append(e_utc)
+        if not wc_ids:
+            return {}
+
+        m_ids = list(cfgs)
+        self.env.cr.execute("""
+            WITH windows AS (
+                SELECT machine_id, range_agg(tsrange(ai_start, ai_end)) as mr
+                FROM unnest(%(wc_ids)s::int[], %(starts)s::timestamp[], %(ends)s::timestamp[]) AS t(machine_id, ai_start, ai_end)
+                GROUP BY machine_id
+            ),
+            marks AS (
+                SELECT w.machine_id, w.mr, m.lo, m.hi
+                FROM windows w
+                JOIN unnest(%(m_ids)s::int[], %(los)s::timestamp[], %(his)s::timestamp[]) AS m(machine_id, lo, hi)
+                  ON m.machine_id = w.machine_id
+            ),
+            target_events AS (
+                SELECT 'run' as kind, e.machine_id, e.loss_id, COALESCE(e.end_time <= m.hi, FALSE) as sealed,
+                       tsmultirange(mes_interval_range(e.start_time, COALESCE(e.end_time, %(now)s))) * m.mr as eff
+                FROM mes_performance_running e
+                JOIN marks m ON m.machine_id = e.machine_id AND mes_interval_range(e.start_time, e.end_time) && tsrange(m.lo, NULL, '(]')
+                UNION ALL
+                SELECT 'alarm', e.machine_id, e.loss_id, COALESCE(e.end_time <= m.hi, FALSE),
+                       tsmultirange(mes_interval_range(e.start_time, COALESCE(e.end_time, %(now)s))) * m.mr
+                FROM mes_performance_alarm e
+                JOIN marks m ON m.machine_id = e.machine_id AND mes_interval_range(e.start_time, e.end_time) && tsrange(m.lo, NULL, '(]')
+            ),
+            intersected AS (
+                SELECT t.kind, t.machine_id, t.loss_id, t.sealed, lower(r) as eff_start, upper(r) as eff_end
+                FROM target_events t, unnest(t.eff) r
+            )
+            SELECT kind, machine_id, loss_id, sealed, SUM(EXTRACT(EPOCH FROM (eff_end - eff_start))), MIN(eff_start)
+            FROM intersected WHERE eff_start < eff_end
+            GROUP BY kind, machine_id, loss_id, sealed
+        """, {
+            'wc_ids': wc_ids, 'starts': starts, 'ends': ends, 'now': fields.Datetime.now(),
+            'm_ids': m_ids, 'los': [cfgs[i]['lo'] for i in m_ids], 'his': [cfgs[i]['hi'] for i in m_ids]
+        })
+
+        res = {}
+        for kind, wc_id, loss_id, sealed, dur, first_start in self.env.cr.fetchall():
+            part = res.setdefault(wc_id, {
+                'run': {True: 0.0, False: 0.0}, 'first_start': {True: False, False: False},
+                'losses': {True: {}, False: {}}
+            })
+            if kind == 'run':
+                part['run'][sealed] += float(dur or 0.0)
+                cur_first = part['first_start'][sealed]
+                if first_start and (not cur_first or first_start < cur_first):
+                    part['first_start'][sealed] = first_start
+            elif loss_id:
+                losses = part['losses'][sealed]
+                losses[str(loss_id)] = losses.get(str(loss_id), 0.0) + float(dur or 0.0)
+        return res
+
     def _get_planned_working_intervals(self, start_utc, end_utc, workcenter):
         if not workcenter:
             return [(start_utc, end_utc)], (end_utc - start_utc).total_seconds()
@@ -157,42 +243,9 @@ class MesMachineSettings(models.Model):
         if start_utc >= calc_end_utc:
             return [], 0.0
 
-        downtimes = self.env['mes.flat.downtime'].search([
-            ('machine_id', '=', workcenter.id),
-            ('start_time', '<', calc_end_utc),
-            ('end_time', '>', start_utc)
-        ])
-
-        intervals = []
-        for dt in downtimes:
-            dt_s = max(dt.start_time, start_utc)
-            dt_e = min(dt.end_time, calc_end_utc)
-            if dt_s < dt_e:
-                intervals.append([dt_s, dt_e])
-
-        if intervals:
-            intervals.sort(key=lambda x: x[0])
-            merged = [intervals[0]]
-            for current in intervals[1:]:
-                last = merged[-1]
-                if current[0] <= last[1]:
-                    last[1] = max(last[1], current[1])
-                else:
-                    merged.append(current)
-            intervals = merged
-
-        active_intervals = []
-        current_time = start_utc
-        for dt in intervals:
-            if current_time < dt[0]:
-                active_intervals.append((current_time, dt[0]))
-            current_time = max(current_time, dt[1])
-
-        if current_time < calc_end_utc:
-            active_intervals.append((current_time, calc_end_utc))
-
-        total_sec = sum((i[1] - i[0]).total_seconds() for i in active_intervals)
-        return active_intervals, total_sec
+        downtimes = self.env['mes.flat.downtime']._get_downtime_index(workcenter.id)
+        active = IntervalSet.span(start_utc, calc_end_utc).subtract(downtimes.window(start_utc, calc_end_utc))
+        return active.to_pairs(), active.duration()
 
     def _fetch_waste_stats_raw(self, cursor, start_loc, end_loc):
         s_str = start_loc.strftime('%Y-%m-%d %H:%M:%S.%f')
@@ -247,6 +300,35 @@ class MesMachineSettings(models.Model):
                 })
         return res
 
+    def _fetch_count_deltas(self, cursor, lo_loc, hi_loc, lag_sec):
+        cursor.execute("""
+            WITH src AS (
+                SELECT tag_name, time, value FROM telemetry_count
+                WHERE machine_name = %(mac)s AND time >= %(lo)s AND time < %(hi)s
+            ),
+            seal AS (
+                SELECT GREATEST(max(time) - make_interval(secs => %(lag)s), %(lo)s::timestamptz) AS t FROM src
+            )
+            SELECT s.tag_name, seal.t,
+                   SUM(s.value) FILTER (WHERE s.time < seal.t), MIN(s.value) FILTER (WHERE s.time < seal.t), MAX(s.value) FILTER (WHERE s.time < seal.t),
+                   SUM(s.value) FILTER (WHERE s.time >= seal.t), MIN(s.value) FILTER (WHERE s.time >= seal.t), MAX(s.value) FILTER (WHERE s.time >= seal.t)
+            FROM src s CROSS JOIN seal
+            GROUP BY s.tag_name, seal.t
+        """, {
+            'mac': self.name,
+            'lo': lo_loc.strftime('%Y-%m-%d %H:%M:%S.%f'),
+            'hi': hi_loc.strftime('%Y-%m-%d %H:%M:%S.%f'),
+            'lag': lag_sec,
+        })
+        seal_loc, sealed, tail = lo_loc, {}, {}
+        for tag, seal_t, s_sum, s_min, s_max, t_sum, t_min, t_max in cursor.fetchall():
+            seal_loc = seal_t.replace(tzinfo=None)
+            if s_min is not None:
+                sealed[tag] = [float(s_sum or 0.0), float(s_min), float(s_max)]
+            if t_min is not None:
+                tail[tag] = [float(t_sum or 0.0), float(t_min), float(t_max)]
+        return seal_loc, sealed, tail
+
     def _fetch_production_chart_raw(self, cursor, tag_names, start_time, end_time, bucket_min):
         if not tag_names: return []
         s_str = start_time.strftime('%Y-%m-%d %H:%M:%S.%f')
@@ -279,6 +361,7 @@ class MesMachineSettings(models.Model):
             'waste_losses': round(waste * 100, 2),
             'downtime_losses': round(max(0.0, 1.0 - avail) * 100, 2) if total_planned_sec > 0 else 0.0,
             'total_produced': total_produced,
+            'runtime_sec': run_sec,
             'runtime_formatted': f"{h:02d}:{m:02d}:{s:02d}",
         }
 
@@ -296,15 +379,12 @@ class MesMachineSettings(models.Model):
         total_running_sec = self._fetch_interval_stats(active_intervals_utc, workcenter.id, mode='runtime')
         
         total_produced = 0.0
-        docs = self.env['mes.machine.performance'].search([
+        valid_docs = self.env['mes.machine.performance'].search([
             ('machine_id', '=', workcenter.id),
-            ('state', '=', 'done')
+            ('state', '=', 'done'),
+            ('start_utc', '<=', s_utc),
+            ('end_utc', '>=', e_utc)
         ])
-        
-        valid_docs = docs.filtered(
-            lambda d: d._get_utc_time(d._get_local_shift_times()[0]) <= s_utc and 
-                      d._get_utc_time(d._get_local_shift_times()[1]) >= e_utc
-        )
 
         if valid_docs:
             prods = valid_docs.production_ids.filtered(lambda p: p.reason_id == workcenter.production_count_id)
@@ -350,26 +430,25 @@ class MesMachineSettings(models.Model):
         }
 
     @api.model
-    def get_realtime_oee_batch(self, wcs):
+    def get_realtime_oee_batch(self, wcs, advance=False):
         if not wcs: return {}
         res, cfgs = {}, {}
         now_utc = fields.Datetime.now()
+        lag_sec = int(self.env['ir.config_parameter'].sudo().get_param('mes_core.oee_seal_lag_sec', 120))
+
+        acc_model = self.env['mes.oee.accumulator'].sudo()
+        fsm_marks = acc_model._fsm_marks(wcs)
+        inst_map = {}
         
         for wc in wcs:
             mac = wc.machine_settings_id
             if not mac: continue
 
-            s_loc, e_loc = self.env['mes.shift'].get_current_shift_window(wc)
-            if not s_loc:
+            inst = self.env['mes.shift.instance']._locate(wc, now_utc)
+            if not inst:
                 res[wc.id] = {'error': 'No active shift'}
                 continue
-                
-            mac_tz = pytz.timezone(wc.company_id.tz or 'UTC')
-            now_loc = pytz.utc.localize(now_utc).astimezone(mac_tz).replace(tzinfo=None)
-            calc_e_loc = min(now_loc, e_loc)
-
-            s_utc = mac_tz.localize(s_loc, is_dst=False).astimezone(pytz.utc).replace(tzinfo=None)
-            calc_e_utc = mac_tz.localize(calc_e_loc, is_dst=False).astimezone(pytz.utc).replace(tzinfo=None)
+            inst_map[wc.id] = inst.id
 
             state_tag, _ = wc.runtime_event_id.get_mapping_for_machine(mac) if wc.runtime_event_id else (None, None)
             count_tag, is_cumul = wc.production_count_id.get_count_config_for_machine(mac) if wc.production_count_id else (None, False)
@@ -378,29 +457,81 @@ class MesMachineSettings(models.Model):
                 res[wc.id] = {'error': 'Config Error'}
                 continue
 
+            s_utc = inst.start_utc
+            calc_e_utc = min(now_utc, inst.end_utc)
             act_ints_utc, plan_sec = mac._get_planned_working_intervals(s_utc, calc_e_utc, wc)
 
             cfgs[wc.id] = {
-                'mac': mac, 'count_tag': count_tag, 'is_cumul': is_cumul,
+                'mac': mac, 'tz': pytz.timezone(wc.company_id.tz or 'UTC'), 'count_tag': count_tag, 'is_cumul': is_cumul,
                 'act_ints_utc': act_ints_utc, 'plan_sec': plan_sec, 'count_id': wc.production_count_id.id,
-                's_loc': s_loc, 'calc_e_loc': calc_e_loc
+                's_utc': s_utc, 'calc_e_utc': calc_e_utc,
+                'margin': max(lag_sec, wc.fsm_min_state_sec or 0, wc.fsm_hysteresis_sec or 0)
             }
 
         if not cfgs: return res
 
-        c_data = {}
+        accs = {a.workcenter_id.id: a for a in acc_model.search([('instance_id', 'in', list(inst_map.values()))])}
+
+        def _loc(cfg, dt_utc):
+            return pytz.utc.localize(dt_utc).astimezone(cfg['tz']).replace(tzinfo=None)
+
+        def _utc(cfg, dt_loc):
+            return cfg['tz'].localize(dt_loc, is_dst=False).astimezone(pytz.utc).replace(tzinfo=None)
+
+        for wc_id, cfg in cfgs.items():
+            acc = accs.get(wc_id)
+            lo = acc.seal_utc if acc else cfg['s_utc']
+            fsm_mark = min(fsm_marks.get(wc_id, lo), cfg['calc_e_utc'])
+            cfg['acc'] = acc
+            cfg['lo'] = lo
+            cfg['hi'] = max(lo, fsm_mark - timedelta(seconds=cfg['margin']))
+            cfg['c_lo'] = (acc.count_seal_utc or acc.seal_utc) if acc else cfg['s_utc']
+
+        deltas = {}
         with self.env['mes.timescale.base']._connection() as conn:
             with conn.cursor() as cur:
                 for wc_id, cfg in cfgs.items():
-                    m_name = cfg['mac'].name
-                    if m_name not in c_data:
-                        c_data[m_name] = cfg['mac']._fetch_waste_stats_raw(cur, cfg['s_loc'], cfg['calc_e_loc'])
+                    c_seal_loc, c_sealed, c_tail = cfg['mac']._fetch_count_deltas(
+                        cur, _loc(cfg, cfg['c_lo']), _loc(cfg, cfg['calc_e_utc']), lag_sec
+                    )
+                    cfg['c_hi'] = max(cfg['c_lo'], _utc(cfg, c_seal_loc))
+                    deltas[wc_id] = (c_sealed, c_tail)
 
         all_rej = self.env['mes.counts'].search([])
+        int_kpis = self._fetch_batch_interval_kpis(cfgs)
+        acc_new, acc_upd, loss_ids = [], [], set()
 
         for wc_id, cfg in cfgs.items():
-            mac = cfg['mac']
-            tot_prod = c_data.get(mac.name, {}).get(cfg['count_tag'], {}).get('cum' if cfg['is_cumul'] else 'sum', 0)
+            mac, acc = cfg['mac'], cfg['acc']
+            i_kpi = int_kpis.get(wc_id, {
+                'run': {True: 0.0, False: 0.0}, 'first_start': {True: False, False: False},
+                'losses': {True: {}, False: {}}
+            })
+            c_sealed, c_tail = deltas[wc_id]
+
+            run_sec = (acc.run_sec if acc else 0.0) + i_kpi['run'][True]
+            first_start = min(filter(None, [acc.first_start if acc else False, i_kpi['first_start'][True]]), default=False)
+            counts = acc_model._merge_counts(acc.counts if acc else {}, c_sealed)
+            losses = acc_model._merge_losses(acc.losses if acc else {}, i_kpi['losses'][True])
+
+            if advance and (cfg['hi'] > cfg['lo'] or cfg['c_hi'] > cfg['c_lo']):
+                vals = {
+                    'seal_utc': cfg['hi'], 'count_seal_utc': cfg['c_hi'], 'run_sec': run_sec,
+                    'first_start': first_start, 'counts': counts, 'losses': losses
+                }
+                if acc:
+                    acc_upd.append((acc.id, vals))
+                else:
+                    vals.update({'workcenter_id': wc_id, 'instance_id': inst_map[wc_id]})
+                    acc_new.append(vals)
+
+            c_data = acc_model._count_totals(acc_model._merge_counts(counts, c_tail))
+            tot_losses = acc_model._merge_losses(losses, i_kpi['losses'][False])
+            top_loss = max(tot_losses.items(), key=lambda x: x[1]) if tot_losses else None
+            if top_loss:
+                loss_ids.add(int(top_loss[0]))
+
+            tot_prod = c_data.get(cfg['count_tag'], {}).get('cum' if cfg['is_cumul'] else 'sum', 0)
 
             top_rej_cnt, top_rej_name = 0, "None"
             for r_cnt in all_rej:
@@ -408,20 +539,29 @@ class MesMachineSettings(models.Model):
                 r_tag, r_is_cum = r_cnt.get_count_config_for_machine(mac)
                 if not r_tag: continue
                     
-                r_amt = c_data.get(mac.name, {}).get(r_tag, {}).get('cum' if r_is_cum else 'sum', 0)
+                r_amt = c_data.get(r_tag, {}).get('cum' if r_is_cum else 'sum', 0)
                 if r_amt > top_rej_cnt:
                     top_rej_cnt, top_rej_name = r_amt, r_cnt.name
 
-            kpi = mac._calculate_kpi(
-                mac._fetch_interval_stats(cfg['act_ints_utc'], wc_id, mode='runtime'), 
-                tot_prod, cfg['plan_sec'], wcs.browse(wc_id)
-            )
+            tail_first = i_kpi['first_start'][False]
+            kpi = mac._calculate_kpi(run_sec + i_kpi['run'][False], tot_prod, cfg['plan_sec'], wcs.browse(wc_id))
             kpi.update({
-                'first_running_time': mac._fetch_interval_stats(cfg['act_ints_utc'], wc_id, mode='first_start'),
-                'top_alarm': mac.get_top_alarm_str(cfg['act_ints_utc'], wc_id),
+                'first_running_time': min(filter(None, [first_start, tail_first]), default=False),
+                'top_alarm': top_loss,
                 'top_rejection': f"{top_rej_name} ({int(top_rej_cnt)})" if top_rej_cnt > 0 else "None"
             })
             res[wc_id] = kpi
+
+        if acc_upd:
+            acc_model._bulk_advance(acc_upd)
+        if acc_new:
+            acc_model.create(acc_new)
+
+        loss_names = {l.id: l.name for l in self.env['mes.event'].browse(list(loss_ids))}
+        for wc_id in cfgs:
+            top_loss = res[wc_id]['top_alarm']
+            res[wc_id]['top_alarm_id'] = int(top_loss[0]) if top_loss else None
+            res[wc_id]['top_alarm'] = f"{loss_names.get(int(top_loss[0]))} ({int((top_loss[1] or 0) // 60)} min)" if top_loss else "None"
         return res
 
     def action_import_machine_counts(self):
@@ -457,11 +597,13 @@ class MesSignalBase(models.AbstractModel):
     def create(self, vals):
         rec = super().create(vals)
         self._sync(rec)
+        self.env.registry.clear_cache()
         return rec
 
     def write(self, vals):
         res = super().write(vals)
         for rec in self: self._sync(rec)
+        self.env.registry.clear_cache()
         return res
 
     def _sync(self, rec):
@@ -482,7 +624,9 @@ class MesSignalCount(models.Model):
 
     def unlink(self):
         for rec in self: self._execute_from_file('delete_signal.sql', (rec.machine_id.name, rec.tag_name))
-        return super().unlink()
+        res = super().unlink()
+        self.env.registry.clear_cache()
+        return res
 
     @api.onchange('count_id')
     def _onchange_count_id(self):
@@ -504,7 +648,9 @@ class MesSignalEvent(models.Model):
         for rec in self:
             if self.search_count([('machine_id', '=', rec.machine_id.id), ('tag_name', '=', rec.tag_name), ('id', '!=', rec.id)]) == 0:
                 self._execute_from_file('delete_signal.sql', (rec.machine_id.name, rec.tag_name))
-        return super().unlink()
+        res = super().unlink()
+        self.env.registry.clear_cache()
+        return res
 
 class MesSignalProcess(models.Model):
     _name = 'mes.signal.process'
@@ -518,7 +664,9 @@ class MesSignalProcess(models.Model):
 
     def unlink(self):
         for rec in self: self._execute_from_file('delete_signal.sql', (rec.machine_id.name, rec.tag_name))
-        return super().unlink()
+        res = super().unlink()
+        self.env.registry.clear_cache()
+        return res
 
 class MesWasteLossStat(models.TransientModel):
     _name = 'mes.waste.loss.stat'
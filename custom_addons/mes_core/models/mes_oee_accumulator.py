@@ -0,0 +1,98 @@
+import json
+import pytz
+import logging
+from datetime import timedelta
+from odoo import models, fields, api
+
+_logger = logging.getLogger(__name__)
+
+class MesOeeAccumulator(models.Model):
+    _name = 'mes.oee.accumulator'
+    _description = 'Running OEE Accumulator'
+
+    workcenter_id = fields.Many2one('mrp.workcenter', string='Machine', required=True, ondelete='cascade', index=True)
+    instance_id = fields.Many2one('mes.shift.instance', string='Shift', required=True, ondelete='cascade', index=True)
+    seal_utc = fields.Datetime(string='Sealed Until', required=True)
+    count_seal_utc = fields.Datetime(string='Counters Sealed Until')
+    run_sec = fields.Float(string='Runtime (sec)')
+    first_start = fields.Datetime(string='First Start')
+    counts = fields.Json(string='Counters')
+    losses = fields.Json(string='Loss Totals')
+
+    _sql_constraints = [
+        ('wc_inst_uniq', 'unique(workcenter_id, instance_id)', 'Accumulator already exists for this shift!')
+    ]
+
+    @api.model
+    def reset(self, wc_ids):
+        if wc_ids:
+            self.sudo().search([('workcenter_id', 'in', list(wc_ids))]).unlink()
+
+    @api.model
+    def _bulk_advance(self, updates):
+        self.env.cr.execute("""
+            UPDATE mes_oee_accumulator a
+            SET seal_utc = v.seal_utc, count_seal_utc = v.count_seal_utc, run_sec = v.run_sec,
+                first_start = v.first_start, counts = v.counts, losses = v.losses,
+                write_uid = %(uid)s, write_date = now() AT TIME ZONE 'UTC'
+            FROM unnest(%(ids)s::int[], %(seals)s::timestamp[], %(c_seals)s::timestamp[], %(runs)s::float8[],
+                        %(firsts)s::timestamp[], %(counts)s::jsonb[], %(losses)s::jsonb[])
+                 AS v(id, seal_utc, count_seal_utc, run_sec, first_start, counts, losses)
+            WHERE a.id = v.id
+        """, {
+            'uid': self.env.uid,
+            'ids': [acc_id for acc_id, _v in updates],
+            'seals': [v['seal_utc'] for _i, v in updates],
+            'c_seals': [v['count_seal_utc'] for _i, v in updates],
+            'runs': [v['run_sec'] for _i, v in updates],
+            'firsts': [v['first_start'] or None for _i, v in updates],
+            'counts': [json.dumps(v['counts']) for _i, v in updates],
+            'losses': [json.dumps(v['losses']) for _i, v in updates],
+        })
+        self.invalidate_model(['seal_utc', 'count_seal_utc', 'run_sec', 'first_start', 'counts', 'losses', 'write_uid', 'write_date'])
+
+    @api.model
+    def _gc(self):
+        cutoff = fields.Datetime.now() - timedelta(days=1)
+        self.sudo().search([('instance_id.end_utc', '<', cutoff)]).unlink()
+
+    @api.model
+    def _fsm_marks(self, wcs):
+        if not wcs:
+            return {}
+        self.env.cr.execute("""
+            SELECT machine_id, last_time, lag_sec, updated_at
+            FROM mes_fsm_watermark WHERE machine_id IN %s
+        """, (tuple(wcs.ids),))
+
+        res = {}
+        for wc_id, last_time, lag_sec, upd_dt in self.env.cr.fetchall():
+            if lag_sec == 0 and upd_dt:
+                res[wc_id] = upd_dt
+            elif last_time:
+                wc = wcs.browse(wc_id)
+                mac_tz = pytz.timezone(wc.company_id.tz or 'UTC')
+                res[wc_id] = mac_tz.localize(last_time.replace(tzinfo=None), is_dst=False).astimezone(pytz.utc).replace(tzinfo=None)
+        return res
+
+    @api.model
+    def _merge_counts(self, base, delta):
+        res = {tag: list(v) for tag, v in (base or {}).items()}
+        for tag, (d_sum, d_min, d_max) in delta.items():
+            cur = res.get(tag)
+            if cur:
+                res[tag] = [cur[0] + d_sum, min(cur[1], d_min), max(cur[2], d_max)]
+            else:
+                res[tag] = [d_sum, d_min, d_max]
+        return res
+
+    @api.model
+    def _merge_losses(self, base, delta):
+        res = dict(base or {})
+        for loss_id, sec in delta.items():
+            res[loss_id] = res.get(loss_id, 0.0) + sec
+        return res
+
+    @api.model
+    def _count_totals(self, counts):
+        return {tag: {'sum': v[0], 'cum': v[2] - v[1]} for tag, v in counts.items()}
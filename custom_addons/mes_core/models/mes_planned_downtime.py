@@ -1,7 +1,12 @@
-from odoo import models, fields, api
+from odoo import models, fields, api, tools
+from odoo.addons.mes_core.tools.interval_set import IntervalSet
 from datetime import datetime, timedelta
+import hashlib
+import logging
 import pytz
 
+_logger = logging.getLogger(__name__)
+
 class MesPlannedDowntime(models.Model):
     _name = 'mes.planned.downtime'
     _description = 'Planned Downtime Rule'
@@ -20,6 +25,63 @@ class MesPlannedDowntime(models.Model):
     date_start = fields.Datetime(required=True)
     date_end = fields.Datetime(required=True)
 
+    flat_hash = fields.Char(string='Generated Signature', copy=False, readonly=True)
+    flat_horizon = fields.Date(string='Generated Until', copy=False, readonly=True)
+
+    def write(self, vals):
+        res = super().write(vals)
+        if set(vals) - {'flat_hash', 'flat_horizon'}:
+            self.env.registry.clear_cache()
+        return res
+
+    def unlink(self):
+        self.env['mes.oee.accumulator'].reset(set(self.machine_ids.ids))
+        res = super().unlink()
+        self.env.registry.clear_cache()
+        return res
+
+    def _flat_signature(self, tz_name):
+        self.ensure_one()
+        raw = repr((self.rule_type, self.active, self.date_start, self.date_end, sorted(self.machine_ids.ids), tz_name))
+        return hashlib.sha1(raw.encode()).hexdigest()
+
+    def _target_occurrences(self, tz, start_date, end_date, now_utc):
+        self.ensure_one()
+        res = set()
+        if not self.active or not self.date_start or not self.date_end:
+            return res
+
+        if self.rule_type == 'one_time':
+            return {(m_id, self.date_start, self.date_end) for m_id in self.machine_ids.ids}
+
+        loc_ref_start = pytz.utc.localize(self.date_start).astimezone(tz)
+        loc_ref_end = pytz.utc.localize(self.date_end).astimezone(tz)
+        ref_start_time = loc_ref_start.time()
+        ref_end_time = loc_ref_end.time()
+        ref_duration_days = (loc_ref_end.date() - loc_ref_start.date()).days
+        first_date = start_date - timedelta(days=ref_duration_days + 1)
+
+        if self.rule_type == 'daily':
+            dates = [first_date + timedelta(days=i) for i in range((end_date - first_date).days + 1)]
+            dates = [d for d in dates if d >= loc_ref_start.date() and d.weekday() < 5]
+        else:
+            target_date = loc_ref_start.date()
+            while target_date < first_date:
+                target_date += timedelta(weeks=1)
+            dates = []
+            while target_date <= end_date:
+                dates.append(target_date)
+                target_date += timedelta(weeks=1)
+
+        for target_date in dates:
+            target_loc_start = tz.localize(datetime.combine(target_date, ref_start_time))
+            target_loc_end = tz.localize(datetime.combine(target_date + timedelta(days=ref_duration_days), ref_end_time))
+            utc_start_save = target_loc_start.astimezone(pytz.utc).replace(tzinfo=None)
+            utc_end_save = target_loc_end.astimezone(pytz.utc).replace(tzinfo=None)
+            if utc_end_save > now_utc:
+                res.update((m_id, utc_start_save, utc_end_save) for m_id in self.machine_ids.ids)
+        return res
+
     @api.model
     def generate_flat_schedule_for_week(self, days_ahead=14):
         if isinstance(days_ahead, (list, tuple)) or not isinstance(days_ahead, int):
@@ -35,85 +97,40 @@ class MesPlannedDowntime(models.Model):
         start_date = local_now.date()
         end_date = start_date + timedelta(days=days_ahead)
 
-        vals_list = []
-        rules = self if self else self.search([('active', '=', True)])
+        force = bool(self)
+        rules = self if self else self.with_context(active_test=False).search([])
 
+        vals_list, stale = [], flat_model
         for rule in rules:
-            if not rule.date_start or not rule.date_end:
+            sig = rule._flat_signature(user_tz)
+            if not force and sig == rule.flat_hash and (rule.rule_type == 'one_time' or (rule.flat_horizon and rule.flat_horizon >= end_date)):
                 continue
 
-            if rule.rule_type == 'one_time':
-                flat_model.search([('rule_id', '=', rule.id)]).unlink()
-            else:
-                flat_model.search([
-                    ('rule_id', '=', rule.id), 
-                    ('start_time', '>=', now_utc)
-                ]).unlink()
+            target = rule._target_occurrences(tz, start_date, end_date, now_utc)
+            domain = [('rule_id', '=', rule.id)]
+            if rule.rule_type != 'one_time' or not rule.active:
+                domain.append(('end_time', '>', now_utc))
 
-            loc_ref_start = pytz.utc.localize(rule.date_start).astimezone(tz)
-            loc_ref_end = pytz.utc.localize(rule.date_end).astimezone(tz)
-            
-            ref_start_time = loc_ref_start.time()
-            ref_end_time = loc_ref_end.time()
-            
-            ref_duration_days = (loc_ref_end.date() - loc_ref_start.date()).days
-
-            for machine in rule.machine_ids:
-                if rule.rule_type == 'one_time':
-                    vals_list.append({
-                        'machine_id': machine.id,
-                        'rule_id': rule.id,
-                        'start_time': rule.date_start,
-                        'end_time': rule.date_end,
-                    })
-                
-                elif rule.rule_type == 'daily':
-                    for i in range((end_date - start_date).days + 1):
-                        target_date = start_date + timedelta(days=i)
-                        
-                        if target_date < loc_ref_start.date():
-                            continue
-
-                        if target_date.weekday() < 5: 
-                            target_loc_start = tz.localize(datetime.combine(target_date, ref_start_time))
-                            target_loc_end = tz.localize(datetime.combine(target_date + timedelta(days=ref_duration_days), ref_end_time))
-                            
-                            utc_start_save = target_loc_start.astimezone(pytz.utc).replace(tzinfo=None)
-                            utc_end_save = target_loc_end.astimezone(pytz.utc).replace(tzinfo=None)
-                            
-                            if utc_end_save > now_utc:
-                                vals_list.append({
-                                    'machine_id': machine.id,
-                                    'rule_id': rule.id,
-                                    'start_time': utc_start_save,
-                                    'end_time': utc_end_save,
-                                })
-                                
-                elif rule.rule_type == 'weekend':
-                    target_date = loc_ref_start.date()
-                    
-                    while target_date < start_date:
-                        target_date += timedelta(weeks=1)
-                        
-                    while target_date <= end_date:
-                        target_loc_start = tz.localize(datetime.combine(target_date, ref_start_time))
-                        target_loc_end = tz.localize(datetime.combine(target_date + timedelta(days=ref_duration_days), ref_end_time))
-                        
-                        utc_start_save = target_loc_start.astimezone(pytz.utc).replace(tzinfo=None)
-                        utc_end_save = target_loc_end.astimezone(pytz.utc).replace(tzinfo=None)
-                        
-                        if utc_end_save > now_utc:
-                            vals_list.append({
-                                'machine_id': machine.id,
-                                'rule_id': rule.id,
-                                'start_time': utc_start_save,
-                                'end_time': utc_end_save,
-                            })
-                            
-                        target_date += timedelta(weeks=1)
-        
+            for rec in flat_model.search(domain):
+                key = (rec.machine_id.id, rec.start_time, rec.end_time)
+                if key in target:
+                    target.discard(key)
+                else:
+                    stale |= rec
+
+            vals_list.extend({
+                'machine_id': m_id,
+                'rule_id': rule.id,
+                'start_time': s_utc,
+                'end_time': e_utc,
+            } for m_id, s_utc, e_utc in sorted(target))
+            rule.write({'flat_hash': sig, 'flat_horizon': end_date})
+
+        if stale:
+            stale.unlink()
         if vals_list:
             flat_model.create(vals_list)
+        _logger.info("FLAT DOWNTIME | %s rules checked | +%s / -%s rows", len(rules), len(vals_list), len(stale))
 
 class MesFlatDowntime(models.Model):
     _name = 'mes.flat.downtime'
@@ -127,6 +144,39 @@ class MesFlatDowntime(models.Model):
 
     duration = fields.Float(compute='_compute_duration', string='Duration (Hours)')
 
+    @api.model
+    @tools.ormcache('wc_id')
+    def _get_downtime_index(self, wc_id):
+        self.env.cr.execute("""
+            SELECT start_time, end_time FROM mes_flat_downtime
+            WHERE machine_id = %s ORDER BY start_time
+        """, (wc_id,))
+        return IntervalSet.from_pairs(self.env.cr.fetchall())
+
+    def _reset_accumulators(self):
+        now_utc = fields.Datetime.now()
+        self.env['mes.oee.accumulator'].reset(set(self.filtered(lambda d: d.start_time < now_utc).machine_id.ids))
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        recs = super().create(vals_list)
+        recs._reset_accumulators()
+        self.env.registry.clear_cache()
+        return recs
+
+    def write(self, vals):
+        self._reset_accumulators()
+        res = super().write(vals)
+        self._reset_accumulators()
+        self.env.registry.clear_cache()
+        return res
+
+    def unlink(self):
+        self._reset_accumulators()
+        res = super().unlink()
+        self.env.registry.clear_cache()
+        return res
+
     @api.depends('start_time', 'end_time')
     def _compute_duration(self):
         for rec in self:
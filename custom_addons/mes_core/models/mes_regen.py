@@ -0,0 +1,193 @@
+import logging
+from datetime import timedelta
+from odoo import models, fields, api, _
+from odoo.exceptions import UserError
+
+_logger = logging.getLogger(__name__)
+
+REGEN_LOCK_NS = 4713
+
+class MesRegenRun(models.Model):
+    _name = 'mes.regen.run'
+    _description = 'Historical Shift Regeneration'
+    _order = 'id desc'
+
+    name = fields.Char(string='Name', required=True, default='New', readonly=True, copy=False)
+    start_date = fields.Datetime(string='Start DateTime', required=True)
+    end_date = fields.Datetime(string='End DateTime', required=True)
+    machine_ids = fields.Many2many('mrp.workcenter', string='Machines', required=True)
+    state = fields.Selection([
+        ('draft', 'Draft'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('cancel', 'Cancelled')
+    ], string='Status', default='draft', required=True)
+    started_at = fields.Datetime(string='Started At', readonly=True)
+    finished_at = fields.Datetime(string='Finished At', readonly=True)
+    chunk_ids = fields.One2many('mes.regen.chunk', 'run_id', string='Chunks')
+
+    total_shifts = fields.Integer(string='Total Shifts', compute='_compute_progress')
+    done_shifts = fields.Integer(string='Processed Shifts', compute='_compute_progress')
+    failed_chunks = fields.Integer(string='Failed Chunks', compute='_compute_progress')
+    progress = fields.Float(string='Progress', compute='_compute_progress')
+    eta = fields.Datetime(string='ETA', compute='_compute_progress')
+
+    @api.depends('chunk_ids.total_count', 'chunk_ids.done_count', 'chunk_ids.state')
+    def _compute_progress(self):
+        now = fields.Datetime.now()
+        for run in self:
+            total = sum(run.chunk_ids.mapped('total_count'))
+            done = sum(run.chunk_ids.mapped('done_count'))
+            run.total_shifts = total
+            run.done_shifts = done
+            run.failed_chunks = len(run.chunk_ids.filtered(lambda c: c.state == 'failed'))
+            run.progress = (done * 100.0 / total) if total else 0.0
+            run.eta = False
+            if run.state == 'running' and run.started_at and 0 < done < total:
+                elapsed = (now - run.started_at).total_seconds()
+                run.eta = now + timedelta(seconds=elapsed * (total - done) / done)
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        for vals in vals_list:
+            if vals.get('name', 'New') == 'New':
+                vals['name'] = f"REGEN/{fields.Datetime.now().strftime('%Y%m%d-%H%M%S')}"
+        return super().create(vals_list)
+
+    def action_start(self):
+        for run in self:
+            if run.state not in ('draft', 'cancel'):
+                continue
+            if run.start_date >= run.end_date:
+                raise UserError(_("Start must be before end."))
+
+            inst_model = self.env['mes.shift.instance']
+            inst_model.generate((run.start_date - timedelta(days=1)).date(), run.end_date.date(), run.machine_ids)
+            self.env.cr.execute("""
+                SELECT workcenter_id, shift_id, COUNT(*)
+                FROM mes_shift_instance
+                WHERE workcenter_id IN %s AND start_utc >= %s AND start_utc <= %s
+                GROUP BY workcenter_id, shift_id
+            """, (tuple(run.machine_ids.ids), run.start_date, run.end_date))
+
+            existing = {(c.workcenter_id.id, c.shift_id.id): c for c in run.chunk_ids}
+            new_vals = []
+            for wc_id, shift_id, cnt in self.env.cr.fetchall():
+                chunk = existing.get((wc_id, shift_id))
+                if chunk:
+                    chunk.total_count = cnt
+                else:
+                    new_vals.append({'run_id': run.id, 'workcenter_id': wc_id, 'shift_id': shift_id, 'total_count': cnt})
+            if new_vals:
+                self.env['mes.regen.chunk'].create(new_vals)
+
+            run.write({'state': 'running', 'started_at': run.started_at or fields.Datetime.now(), 'finished_at': False})
+            run._enqueue_chunks()
+        return True
+
+    def action_resume(self):
+        for run in self.filtered(lambda r: r.state in ('running', 'done')):
+            run.chunk_ids.filtered(lambda c: c.state == 'failed').write({'state': 'pending', 'error': False})
+            run.write({'state': 'running', 'finished_at': False})
+            run._enqueue_chunks()
+        return True
+
+    def action_cancel(self):
+        self.filtered(lambda r: r.state in ('draft', 'running')).write({'state': 'cancel'})
+        return True
+
+    def _enqueue_chunks(self):
+        self.ensure_one()
+        for chunk in self.chunk_ids.filtered(lambda c: c.state in ('pending', 'running')):
+            chunk.with_delay(
+                channel='root.mes_regen',
+                description=f"Regen {chunk.workcenter_id.name} / {chunk.shift_id.name}",
+                priority=20,
+                identity_key=f"mes_regen_{chunk.id}"
+            ).action_run_chunk_job()
+
+    def _check_done(self):
+        for run in self.filtered(lambda r: r.state == 'running'):
+            if not run.chunk_ids.filtered(lambda c: c.state in ('pending', 'running')):
+                run.write({'state': 'done', 'finished_at': fields.Datetime.now()})
+                _logger.info("REGEN DONE | %s | %s shifts, %s failed chunks", run.name, run.done_shifts, run.failed_chunks)
+
+class MesRegenChunk(models.Model):
+    _name = 'mes.regen.chunk'
+    _description = 'Historical Regeneration Chunk'
+    _order = 'workcenter_id, shift_id'
+
+    run_id = fields.Many2one('mes.regen.run', string='Run', required=True, ondelete='cascade', index=True)
+    workcenter_id = fields.Many2one('mrp.workcenter', string='Machine', required=True, ondelete='cascade')
+    shift_id = fields.Many2one('mes.shift', string='Shift', required=True, ondelete='cascade')
+    state = fields.Selection([
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed')
+    ], string='Status', default='pending', required=True)
+    total_count = fields.Integer(string='Shifts')
+    done_count = fields.Integer(string='Processed')
+    last_date = fields.Date(string='Checkpoint')
+    error = fields.Text(string='Error')
+
+    _sql_constraints = [
+        ('run_wc_shift_uniq', 'unique(run_id, workcenter_id, shift_id)', 'Chunk already exists for this run!')
+    ]
+
+    def action_run_chunk_job(self):
+        self.ensure_one()
+        run = self.run_id
+        if self.state == 'done' or run.state != 'running':
+            return
+
+        self.env.cr.execute("SELECT pg_try_advisory_lock(%s, %s)", (REGEN_LOCK_NS, self.id))
+        if not self.env.cr.fetchone()[0]:
+            return
+
+        try:
+            self.state = 'running'
+            self.env.cr.commit()
+            self._process_chunk()
+        finally:
+            self.env.cr.execute("SELECT pg_advisory_unlock(%s, %s)", (REGEN_LOCK_NS, self.id))
+
+    def _process_chunk(self):
+        run = self.run_id
+
+        wiz = self.env['mes.hist.performance.wiz']
+        domain = [
+            ('workcenter_id', '=', self.workcenter_id.id),
+            ('shift_id', '=', self.shift_id.id),
+            ('start_utc', '>=', run.start_date),
+            ('start_utc', '<=', run.end_date)
+        ]
+        if self.last_date:
+            domain.append(('date', '>', self.last_date))
+
+        try:
+            now_utc = fields.Datetime.now()
+            for inst in self.env['mes.shift.instance'].search(domain, order='date'):
+                if run.state != 'running':
+                    return
+                wc = inst.workcenter_id
+                wiz._process_single_shift_fsm(self.env, {
+                    'wc_id': wc.id,
+                    'shift_id': inst.shift_id.id,
+                    'tgt_date': inst.date,
+                    's_utc': inst.start_utc, 'e_utc': inst.end_utc,
+                    's_loc': wiz._get_local(wc, inst.start_utc), 'e_loc': wiz._get_local(wc, inst.end_utc)
+                }, now_utc)
+                self.write({'last_date': inst.date, 'done_count': self.done_count + 1})
+                self.env.cr.commit()
+                run.invalidate_recordset(['state'])
+
+            self.state = 'done'
+            self.env['mes.oee.accumulator'].reset([self.workcenter_id.id])
+        except Exception as e:
+            self.env.cr.rollback()
+            _logger.error("REGEN FAULT | %s | WC: %s | Shift: %s | Err: %s", run.name, self.workcenter_id.name, self.shift_id.name, str(e))
+            self.write({'state': 'failed', 'error': str(e)})
+
+        self.env.cr.commit()
+        run._check_done()
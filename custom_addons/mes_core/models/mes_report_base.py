@@ -1,6 +1,7 @@
 from odoo import models, fields, api
 from datetime import datetime, time, timedelta
 import pytz
+from odoo.addons.mes_core.tools.interval_set import IntervalSet
 
 class MesReportBaseWizard(models.TransientModel):
     _name = 'mes.report.base.wizard'
@@ -86,62 +87,40 @@ class MesReportBaseWizard(models.TransientModel):
         else:
             return item_id not in filter_ids
 
-    def _get_logical_periods(self, start_dt, end_dt, shifts, tz_name):
-        tz_obj = pytz.timezone(tz_name)
-        s_utc = pytz.UTC.localize(start_dt)
-        e_utc = pytz.UTC.localize(end_dt)
-        
-        s_loc = s_utc.astimezone(tz_obj)
-        e_loc = e_utc.astimezone(tz_obj)
-        
-        cur_date = s_loc.date()
-        end_date = e_loc.date()
-        
+    def _get_logical_periods(self, start_dt, end_dt, workcenter):
+        tz_obj = pytz.timezone(workcenter.company_id.tz or 'UTC')
+        inst_model = self.env['mes.shift.instance'].sudo()
+        inst_model.generate(start_dt.date() - timedelta(days=1), end_dt.date() + timedelta(days=1), workcenter)
+
+        instances = inst_model.search([
+            ('workcenter_id', '=', workcenter.id),
+            ('start_utc', '<', end_dt),
+            ('end_utc', '>', start_dt),
+        ])
+
         periods = {}
-        
-        while cur_date <= end_date:
-            for shift in shifts:
-                s_hr = int(shift.start_hour)
-                s_min = int(round((shift.start_hour - s_hr) * 60))
-                shift_s = tz_obj.localize(datetime.combine(cur_date, time(s_hr, s_min)))
-                
-                e_hr = int(shift.end_hour)
-                e_min = int(round((shift.end_hour - e_hr) * 60))
-                shift_e = tz_obj.localize(datetime.combine(cur_date, time(e_hr, e_min)))
-                
-                if shift.end_hour <= shift.start_hour:
-                    shift_e += timedelta(days=1)
-                    
-                if shift_s < e_utc and shift_e > s_utc:
-                    act_s = max(shift_s, s_utc).astimezone(pytz.UTC).replace(tzinfo=None)
-                    act_e = min(shift_e, e_utc).astimezone(pytz.UTC).replace(tzinfo=None)
-                    
-                    if self.time_scale == 'shift':
-                        p_name = f"{shift_s.strftime('%Y-%m-%d %H:%M')} [{shift.name}]"
-                    elif self.time_scale == 'day':
-                        p_name = shift_s.strftime('%Y-%m-%d')
-                    elif self.time_scale == 'month':
-                        p_name = shift_s.strftime('%Y-%m')
-                    else:
-                        p_name = "All Period"
-                        
-                    if p_name not in periods:
-                        periods[p_name] = []
-                    periods[p_name].append((act_s, act_e))
-                    
-            cur_date += timedelta(days=1)
-            
+        for inst in instances:
+            shift_s = pytz.UTC.localize(inst.start_utc).astimezone(tz_obj)
+            act_s = max(inst.start_utc, start_dt)
+            act_e = min(inst.end_utc, end_dt)
+
+            if self.time_scale == 'shift':
+                p_name = f"{shift_s.strftime('%Y-%m-%d %H:%M')} [{inst.shift_id.name}]"
+            elif self.time_scale == 'day':
+                p_name = shift_s.strftime('%Y-%m-%d')
+            elif self.time_scale == 'month':
+                p_name = shift_s.strftime('%Y-%m')
+            else:
+                p_name = "All Period"
+
+            if p_name not in periods:
+                periods[p_name] = []
+            periods[p_name].append((act_s, act_e))
+
         return periods
 
     def _merge_intervals(self, intervals):
-        if not intervals: return []
-        intervals.sort(key=lambda x: x[0])
-        merged = [intervals[0]]
-        for current in intervals[1:]:
-            last = merged[-1]
-            if current[0] <= last[1]: merged[-1] = (last[0], max(last[1], current[1]))
-            else: merged.append(current)
-        return merged
+        return IntervalSet.from_pairs(intervals).to_pairs()
 
     def _build_skd_context(self, measures):
         return {
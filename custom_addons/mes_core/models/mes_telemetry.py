@@ -107,4 +107,38 @@ class MesTimescaleDBManager(models.AbstractModel):
             CREATE USER MAPPING FOR "{current_db_user}"
             SERVER {server_name}
             OPTIONS (user %s, password %s);
-        """, (params['user'], params['password']))
\ No newline at end of file
+        """, (params['user'], params['password']))
+
+    @api.model
+    def _get_policy_targets(self):
+        return [
+            ('telemetry_event_raw', 'mes_core.event_retention_days', 'mes_core.event_compress_days'),
+            ('telemetry_count_raw', 'mes_core.count_retention_days', 'mes_core.count_compress_days'),
+            ('telemetry_process_raw', 'mes_core.process_retention_days', 'mes_core.process_compress_days'),
+            ('telemetry_count_1m', 'mes_core.agg_1m_retention_days', None),
+            ('telemetry_count_hourly', 'mes_core.agg_1h_retention_days', None),
+            ('telemetry_process_1m', 'mes_core.agg_1m_retention_days', None),
+            ('telemetry_process_1h', 'mes_core.agg_1h_retention_days', None),
+            ('kpi_snapshot', 'mes_core.kpi_retention_days', 'mes_core.kpi_compress_days'),
+        ]
+
+    @api.model
+    def apply_retention_policies(self):
+        params = self.env['ir.config_parameter'].sudo()
+
+        with self._connection() as conn:
+            with conn.cursor() as cur:
+                for rel, ret_key, cmp_key in self._get_policy_targets():
+                    ret_days = int(params.get_param(ret_key) or 0)
+                    cur.execute("SELECT remove_retention_policy(%s::regclass, if_exists => TRUE)", (rel,))
+                    if ret_days > 0:
+                        cur.execute("SELECT add_retention_policy(%s::regclass, make_interval(days => %s))", (rel, ret_days))
+
+                    if not cmp_key:
+                        continue
+
+                    cmp_days = int(params.get_param(cmp_key) or 14)
+                    cur.execute("SELECT remove_compression_policy(%s::regclass, if_exists => TRUE)", (rel,))
+                    cur.execute("SELECT add_compression_policy(%s::regclass, make_interval(days => %s))", (rel, cmp_days))
+
+                    _logger.info("Timescale policies for %s: retention %s d, compression %s d", rel, ret_days, cmp_days)
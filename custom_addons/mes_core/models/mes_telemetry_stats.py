@@ -1,4 +1,5 @@
 from odoo import models, fields, tools
+from odoo.tools.sql import column_exists
 
 class MesTelemetryHourlyFDW(models.Model):
     _name = 'mes.telemetry.hourly.fdw'
@@ -32,6 +33,42 @@ class MesTelemetryHourlyFDW(models.Model):
             OPTIONS (schema_name 'public', table_name 'telemetry_hourly_stats');
         """ % self._table)
 
+class MesTelemetryProcessHourlyFDW(models.Model):
+    _name = 'mes.telemetry.process.hourly.fdw'
+    _description = 'Hourly Process Signal Statistics'
+    _auto = False
+    _order = 'bucket desc'
+
+    bucket = fields.Datetime(string="Hour Bucket", readonly=True)
+    machine_name = fields.Char(string="Machine", readonly=True)
+    tag_name = fields.Char(string="Tag", readonly=True)
+    sample_count = fields.Integer(string="Samples", readonly=True)
+    avg_val = fields.Float(string="Average", readonly=True, group_operator='avg')
+    min_val = fields.Float(string="Min", readonly=True, group_operator='min')
+    max_val = fields.Float(string="Max", readonly=True, group_operator='max')
+    stddev_val = fields.Float(string="Std Deviation", readonly=True, group_operator='avg')
+
+    def init(self):
+        self.env.cr.execute("DROP FOREIGN TABLE IF EXISTS %s" % self._table)
+        self.env.cr.execute("DROP TABLE IF EXISTS %s" % self._table)
+        self.env.cr.execute("DROP VIEW IF EXISTS %s" % self._table)
+
+        self.env.cr.execute("""
+            CREATE FOREIGN TABLE %s (
+                id BIGINT,
+                bucket TIMESTAMPTZ,
+                machine_name TEXT,
+                tag_name TEXT,
+                sample_count BIGINT,
+                avg_val DOUBLE PRECISION,
+                min_val DOUBLE PRECISION,
+                max_val DOUBLE PRECISION,
+                stddev_val DOUBLE PRECISION
+            )
+            SERVER timescaledb_server
+            OPTIONS (schema_name 'public', table_name 'telemetry_process_hourly_stats');
+        """ % self._table)
+
 class MesAnomalyFDW(models.Model):
     _name = 'mes.anomaly.fdw'
     _description = 'Machine Anomalies Snapshot'
@@ -39,9 +76,11 @@ class MesAnomalyFDW(models.Model):
 
     machine_name = fields.Char(string="Machine", readonly=True)
     current_stops = fields.Float(string="Stops (Last Hour)", readonly=True)
-    historical_avg = fields.Float(string="Avg Stops (Daily)", readonly=True)
+    historical_avg = fields.Float(string="Expected Stops (Hour of Day)", readonly=True)
+    historical_std = fields.Float(string="Std Deviation", readonly=True)
     status = fields.Selection([
         ('normal', 'Normal'), 
+        ('warning', 'Warning'),
         ('critical', 'Critical')
     ], string="Status", readonly=True)
 
@@ -56,8 +95,156 @@ class MesAnomalyFDW(models.Model):
                 machine_name TEXT,
                 current_stops DOUBLE PRECISION,
                 historical_avg DOUBLE PRECISION,
+                historical_std DOUBLE PRECISION,
                 status TEXT
             )
             SERVER timescaledb_server
             OPTIONS (schema_name 'public', table_name 'view_mes_anomalies');
-        """ % self._table)
\ No newline at end of file
+        """ % self._table)
+
+class MesPolicyStatusFDW(models.Model):
+    _name = 'mes.policy.status.fdw'
+    _description = 'Timescale Policy Status'
+    _auto = False
+    _order = 'relation_name, proc_name'
+
+    proc_name = fields.Char(string="Job", readonly=True)
+    relation_name = fields.Char(string="Relation", readonly=True)
+    schedule_interval = fields.Char(string="Schedule", readonly=True)
+    config = fields.Char(string="Config", readonly=True)
+    scheduled = fields.Boolean(string="Active", readonly=True)
+    last_run_status = fields.Char(string="Last Status", readonly=True)
+    last_run_started_at = fields.Datetime(string="Last Run", readonly=True)
+    last_successful_finish = fields.Datetime(string="Last Success", readonly=True)
+    next_start = fields.Datetime(string="Next Run", readonly=True)
+    total_runs = fields.Integer(string="Runs", readonly=True)
+    total_failures = fields.Integer(string="Failures", readonly=True)
+
+    def init(self):
+        self.env.cr.execute("DROP FOREIGN TABLE IF EXISTS %s" % self._table)
+        self.env.cr.execute("DROP TABLE IF EXISTS %s" % self._table)
+        self.env.cr.execute("DROP VIEW IF EXISTS %s" % self._table)
+
+        self.env.cr.execute("""
+            CREATE FOREIGN TABLE %s (
+                id INTEGER,
+                proc_name TEXT,
+                relation_name TEXT,
+                schedule_interval TEXT,
+                config TEXT,
+                scheduled BOOLEAN,
+                last_run_status TEXT,
+                last_run_started_at TIMESTAMPTZ,
+                last_successful_finish TIMESTAMPTZ,
+                next_start TIMESTAMPTZ,
+                total_runs BIGINT,
+                total_failures BIGINT
+            )
+            SERVER timescaledb_server
+            OPTIONS (schema_name 'public', table_name 'view_mes_policy_status');
+        """ % self._table)
+
+class MesKpiLatestFDW(models.Model):
+    _name = 'mes.kpi.latest.fdw'
+    _description = 'Latest Machine KPI Snapshot'
+    _auto = False
+
+    workcenter_id = fields.Many2one('mrp.workcenter', string="Machine", readonly=True)
+    time = fields.Datetime(string="Snapshot Time", readonly=True)
+    oee = fields.Float(string="OEE (%)", readonly=True)
+    availability = fields.Float(string="Availability (%)", readonly=True)
+    performance = fields.Float(string="Performance (%)", readonly=True)
+    quality = fields.Float(string="Quality (%)", readonly=True)
+    produced = fields.Float(string="Produced", digits=(16, 0), readonly=True)
+    waste_losses = fields.Float(string="Waste Losses", readonly=True)
+    downtime_losses = fields.Float(string="Downtime Losses", readonly=True)
+    runtime_sec = fields.Float(string="Runtime (sec)", readonly=True)
+    runtime_formatted = fields.Char(string="Runtime", compute='_compute_runtime_formatted')
+    first_running_time = fields.Datetime(string="First Running Time", readonly=True)
+    top_alarm_id = fields.Many2one('mes.event', string="Top Alarm Event", readonly=True)
+    top_alarm = fields.Char(string="Top Alarm", readonly=True)
+    top_rejection = fields.Char(string="Top Rejection", readonly=True)
+
+    def _compute_runtime_formatted(self):
+        for rec in self:
+            run_sec = max(0.0, rec.runtime_sec or 0.0)
+            rec.runtime_formatted = f"{int(run_sec // 3600):02d}:{int((run_sec % 3600) // 60):02d}:{int(run_sec % 60):02d}"
+
+    def init(self):
+        self.env.cr.execute("DROP FOREIGN TABLE IF EXISTS %s" % self._table)
+        self.env.cr.execute("DROP TABLE IF EXISTS %s" % self._table)
+        self.env.cr.execute("DROP VIEW IF EXISTS %s" % self._table)
+
+        self.env.cr.execute("""
+            CREATE FOREIGN TABLE %s (
+                id INTEGER,
+                workcenter_id INTEGER,
+                time TIMESTAMPTZ,
+                oee DOUBLE PRECISION,
+                availability DOUBLE PRECISION,
+                performance DOUBLE PRECISION,
+                quality DOUBLE PRECISION,
+                produced DOUBLE PRECISION,
+                waste_losses DOUBLE PRECISION,
+                downtime_losses DOUBLE PRECISION,
+                runtime_sec DOUBLE PRECISION,
+                first_running_time TIMESTAMP,
+                top_alarm_id INTEGER,
+                top_alarm TEXT,
+                top_rejection TEXT
+            )
+            SERVER timescaledb_server
+            OPTIONS (schema_name 'public', table_name 'kpi_latest');
+        """ % self._table)
+
+        if column_exists(self.env.cr, 'mrp_workcenter', 'current_oee'):
+            self.env.cr.execute("""
+                INSERT INTO %s (id, workcenter_id, time, oee, availability, performance, quality, produced,
+                                waste_losses, downtime_losses, runtime_sec, first_running_time, top_alarm, top_rejection)
+                SELECT id, id, COALESCE(write_date, now() AT TIME ZONE 'UTC') AT TIME ZONE 'UTC',
+                       current_oee, current_availability, current_performance, current_quality, current_produced,
+                       current_waste_losses, current_downtime_losses,
+                       CASE WHEN current_runtime_formatted ~ '^[0-9]+:[0-9]{2}:[0-9]{2}$'
+                            THEN split_part(current_runtime_formatted, ':', 1)::INTEGER * 3600
+                               + split_part(current_runtime_formatted, ':', 2)::INTEGER * 60
+                               + split_part(current_runtime_formatted, ':', 3)::INTEGER
+                       END,
+                       current_first_running_time, current_top_alarm, current_top_rejection
+                FROM mrp_workcenter
+                WHERE machine_settings_id IS NOT NULL
+                ON CONFLICT DO NOTHING
+            """ % self._table)
+
+class MesKpiHistoryFDW(models.Model):
+    _name = 'mes.kpi.history.fdw'
+    _description = 'Machine KPI History'
+    _auto = False
+    _order = 'time desc'
+
+    workcenter_id = fields.Many2one('mrp.workcenter', string="Machine", readonly=True)
+    time = fields.Datetime(string="Snapshot Time", readonly=True)
+    oee = fields.Float(string="OEE (%)", readonly=True, group_operator='avg')
+    availability = fields.Float(string="Availability (%)", readonly=True, group_operator='avg')
+    performance = fields.Float(string="Performance (%)", readonly=True, group_operator='avg')
+    produced = fields.Float(string="Produced", digits=(16, 0), readonly=True, group_operator='max')
+    top_alarm_id = fields.Many2one('mes.event', string="Top Alarm", readonly=True)
+
+    def init(self):
+        self.env.cr.execute("DROP FOREIGN TABLE IF EXISTS %s" % self._table)
+        self.env.cr.execute("DROP TABLE IF EXISTS %s" % self._table)
+        self.env.cr.execute("DROP VIEW IF EXISTS %s" % self._table)
+
+        self.env.cr.execute("""
+            CREATE FOREIGN TABLE %s (
+                id BIGINT,
+                workcenter_id INTEGER,
+                time TIMESTAMPTZ,
+                oee DOUBLE PRECISION,
+                availability DOUBLE PRECISION,
+                performance DOUBLE PRECISION,
+                produced DOUBLE PRECISION,
+                top_alarm_id INTEGER
+            )
+            SERVER timescaledb_server
+            OPTIONS (schema_name 'public', table_name 'kpi_snapshot_history');
+        """ % self._table)
@@ -46,6 +46,72 @@ class ResConfigSettings(models.TransientModel):
         help="How often the dashboard list of machines will be refreshed (in seconds)"
     )
 
+    mes_event_retention_days = fields.Integer(
+        string="Event Retention (days)",
+        config_parameter='mes_core.event_retention_days',
+        default=0,
+        help="Raw telemetry_event rows older than this are dropped. 0 keeps data forever."
+    )
+    mes_count_retention_days = fields.Integer(
+        string="Count Retention (days)",
+        config_parameter='mes_core.count_retention_days',
+        default=0,
+        help="Raw telemetry_count rows older than this are dropped. 0 keeps data forever."
+    )
+    mes_process_retention_days = fields.Integer(
+        string="Process Retention (days)",
+        config_parameter='mes_core.process_retention_days',
+        default=0,
+        help="Raw telemetry_process rows older than this are dropped. 0 keeps data forever."
+    )
+    mes_event_compress_days = fields.Integer(
+        string="Event Compression (days)",
+        config_parameter='mes_core.event_compress_days',
+        default=14
+    )
+    mes_count_compress_days = fields.Integer(
+        string="Count Compression (days)",
+        config_parameter='mes_core.count_compress_days',
+        default=14
+    )
+    mes_process_compress_days = fields.Integer(
+        string="Process Compression (days)",
+        config_parameter='mes_core.process_compress_days',
+        default=14
+    )
+    mes_agg_1m_retention_days = fields.Integer(
+        string="1-Minute Aggregate Retention (days)",
+        config_parameter='mes_core.agg_1m_retention_days',
+        default=0
+    )
+    mes_agg_1h_retention_days = fields.Integer(
+        string="Hourly Aggregate Retention (days)",
+        config_parameter='mes_core.agg_1h_retention_days',
+        default=0
+    )
+    mes_kpi_retention_days = fields.Integer(
+        string="KPI History Retention (days)",
+        config_parameter='mes_core.kpi_retention_days',
+        default=0,
+        help="KPI snapshots older than this are dropped. 0 keeps data forever."
+    )
+    mes_kpi_compress_days = fields.Integer(
+        string="KPI History Compression (days)",
+        config_parameter='mes_core.kpi_compress_days',
+        default=14
+    )
+
+    mes_fsm_push_enabled = fields.Boolean(
+        string="Push-Driven Machine States",
+        config_parameter='mes_core.fsm_push_enabled',
+        help="Listen for new telemetry events and update machine states within seconds instead of waiting for the minute cron."
+    )
+    mes_fsm_push_debounce_ms = fields.Integer(
+        string="Push Debounce (ms)",
+        config_parameter='mes_core.fsm_push_debounce_ms',
+        default=1000
+    )
+
     stock_move_sms_validation = fields.Boolean(
         string="SMS Validation for Stock Moves",
         config_parameter='stock.sms_validation'
@@ -57,6 +123,43 @@ class ResConfigSettings(models.TransientModel):
         config_parameter='stock.sms_template_id'
     )
 
+    def _get_policy_fields(self):
+        return [
+            ('mes_event_retention_days', 'mes_event_compress_days'),
+            ('mes_count_retention_days', 'mes_count_compress_days'),
+            ('mes_process_retention_days', 'mes_process_compress_days'),
+            ('mes_agg_1m_retention_days', None),
+            ('mes_agg_1h_retention_days', None),
+            ('mes_kpi_retention_days', 'mes_kpi_compress_days'),
+        ]
+
+    def _check_policy_values(self):
+        for ret_f, cmp_f in self._get_policy_fields():
+            ret_days = self[ret_f]
+            cmp_days = self[cmp_f] if cmp_f else 0
+            if ret_days < 0 or (cmp_f and cmp_days < 1):
+                raise UserError(_("Retention cannot be negative and compression age must be at least 1 day."))
+            if ret_days and cmp_days and ret_days <= cmp_days:
+                raise UserError(_("%s must be longer than %s.") % (self._fields[ret_f].string, self._fields[cmp_f].string))
+
+        if 0 < self.mes_count_retention_days < 3:
+            raise UserError(_("Count retention must keep at least 3 days so the hourly aggregate can still be refreshed."))
+        if 0 < self.mes_agg_1m_retention_days < 3:
+            raise UserError(_("1-minute aggregate retention must keep at least 3 days so the hourly process aggregate can still be refreshed."))
+
+    def set_values(self):
+        pol_fields = [f for pair in self._get_policy_fields() for f in pair if f]
+        old_vals = self.get_values()
+
+        self._check_policy_values()
+        super().set_values()
+
+        if any(old_vals.get(f) != self[f] for f in pol_fields):
+            self.env['mes.timescale.db.manager'].apply_retention_policies()
+
+    def action_open_policy_status(self):
+        return self.env['ir.actions.act_window']._for_xml_id('mes_core.action_mes_policy_status')
+
     def action_test_sql_connection(self):
         self.ensure_one()
         
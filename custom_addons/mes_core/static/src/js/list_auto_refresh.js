@@ -11,7 +11,22 @@ patch(ListController.prototype, {
         
         if (this.props.resModel === 'mrp.workcenter') {
             this.orm = useService("orm");
+            this.busService = useService("bus_service");
             this.refreshTimer = null;
+            this.kpiReloadTimer = null;
+
+            this.onKpiUpdate = (payload) => {
+                const ids = this.model.root.records.map((rec) => rec.resId);
+                if (!ids.includes(payload.workcenter_id) || this.kpiReloadTimer) {
+                    return;
+                }
+                this.kpiReloadTimer = setTimeout(() => {
+                    this.kpiReloadTimer = null;
+                    this.model.load();
+                }, 500);
+            };
+            this.busService.addChannel("mes_kpi");
+            this.busService.subscribe("mes_kpi/updated", this.onKpiUpdate);
 
             onWillStart(async () => {
                 let intervalMs = 60000; 
@@ -40,6 +55,11 @@ patch(ListController.prototype, {
                 if (this.refreshTimer) {
                     clearInterval(this.refreshTimer);
                 }
+                if (this.kpiReloadTimer) {
+                    clearTimeout(this.kpiReloadTimer);
+                }
+                this.busService.unsubscribe("mes_kpi/updated", this.onKpiUpdate);
+                this.busService.deleteChannel("mes_kpi");
             });
         }
     }
@@ -1 +1,4 @@
-from . import maintainx_api
\ No newline at end of file
+from . import maintainx_api
+from . import fsm_core
+from . import fsm_listener
+from . import interval_set
@@ -0,0 +1,118 @@
+from collections import defaultdict
+
+
+class IntervalBuilder:
+    def __init__(self, active=None, prev=None, min_sec=0, hyst_sec=0):
+        self.active = active
+        self.prev = prev
+        self.min_sec = min_sec or 0
+        self.hyst_sec = hyst_sec or 0
+        self.pending = []
+        self.dropped = []
+        self.suppressed = defaultdict(int)
+
+    @staticmethod
+    def make_state(model, loss_id, start_time, doc_id, rec_id=None, end_time=None):
+        return {
+            'model': model,
+            'loss_id': loss_id,
+            'start_time': start_time,
+            'end_time': end_time,
+            'doc_id': doc_id,
+            'rec_id': rec_id,
+            'dirty': False,
+        }
+
+    @classmethod
+    def from_record(cls, rec, prev_rec=None, min_sec=0, hyst_sec=0):
+        active = prev = None
+        if rec:
+            active = cls.make_state(rec._name, rec.loss_id.id, rec.start_time, rec.performance_id.id, rec.id)
+        if prev_rec:
+            prev = cls.make_state(prev_rec._name, prev_rec.loss_id.id, prev_rec.start_time,
+                                  prev_rec.performance_id.id, prev_rec.id, prev_rec.end_time)
+        return cls(active, prev, min_sec, hyst_sec)
+
+    def is_same(self, model, loss_id):
+        return bool(self.active) and self.active['model'] == model and self.active['loss_id'] == loss_id
+
+    def set_loss(self, loss_id):
+        if self.active and self.active['loss_id'] != loss_id:
+            self.active['loss_id'] = loss_id
+            self.active['dirty'] = True
+
+    def transition(self, model, loss_id, ts, doc_id):
+        if self.is_same(model, loss_id):
+            return False
+        if self._suppress(model, loss_id, ts) and self.is_same(model, loss_id):
+            return False
+        self.close(ts)
+        self.active = self.make_state(model, loss_id, ts, doc_id)
+        return True
+
+    def _suppress(self, model, loss_id, ts):
+        cur, prev = self.active, self.prev
+        if not cur or not prev or prev['end_time'] != cur['start_time']:
+            return False
+
+        dur = (ts - cur['start_time']).total_seconds()
+        bounce = prev['model'] == model and prev['loss_id'] == loss_id
+        if dur >= self.min_sec and not (bounce and dur < self.hyst_sec):
+            return False
+
+        self.pending = [it for it in self.pending if it is not cur and it is not prev]
+        if cur['rec_id']:
+            self.dropped.append((cur['model'], cur['rec_id']))
+        self.suppressed[cur['doc_id']] += 1
+
+        prev['end_time'] = None
+        prev['dirty'] = True
+        self.active, self.prev = prev, None
+        return True
+
+    def close(self, ts):
+        if self.active:
+            self.active['end_time'] = ts
+            self.active['dirty'] = True
+            self.pending.append(self.active)
+            self.prev = self.active
+            self.active = None
+
+    def flush(self, env):
+        for model, rec_id in self.dropped:
+            env[model].browse(rec_id).exists().unlink()
+        self.dropped = []
+
+        items = list(self.pending)
+        if self.active and (not self.active['rec_id'] or self.active['dirty']):
+            items.append(self.active)
+
+        new_by_model = defaultdict(list)
+        for it in items:
+            if it['rec_id']:
+                if it['dirty']:
+                    env[it['model']].browse(it['rec_id']).write({
+                        'loss_id': it['loss_id'],
+                        'end_time': it['end_time'] or False,
+                    })
+            else:
+                new_by_model[it['model']].append(it)
+
+        for model, model_items in new_by_model.items():
+            recs = env[model].create([{
+                'performance_id': it['doc_id'],
+                'loss_id': it['loss_id'],
+                'start_time': it['start_time'],
+                'end_time': it['end_time'] or False,
+            } for it in model_items])
+            for it, rec in zip(model_items, recs):
+                it['rec_id'] = rec.id
+
+        for doc in env['mes.machine.performance'].browse(list(self.suppressed)).exists():
+            doc.suppressed_transitions += self.suppressed[doc.id]
+        self.suppressed.clear()
+
+        for it in items:
+            it['dirty'] = False
+        self.pending = []
+        return len(items)
@@ -0,0 +1,106 @@
+import time
+import select
+import logging
+import threading
+import psycopg2
+import psycopg2.extensions
+
+import odoo
+from odoo import api, SUPERUSER_ID
+from odoo.tools import config, str2bool
+
+_logger = logging.getLogger(__name__)
+
+CHANNEL = 'telemetry_event'
+LOCK_KEY = 4712
+IDLE_SEC = 30
+
+_listeners = {}
+_listeners_lock = threading.Lock()
+
+
+class FsmListener(threading.Thread):
+    def __init__(self, dbname):
+        super().__init__(name=f"mes_fsm_listener.{dbname}", daemon=True)
+        self.dbname = dbname
+
+    def run(self):
+        while True:
+            try:
+                cfg = self._load_config()
+                if cfg['enabled']:
+                    self._listen(cfg)
+            except Exception:
+                _logger.exception("FSM LISTENER FAULT | DB: %s", self.dbname)
+            time.sleep(IDLE_SEC)
+
+    def _load_config(self):
+        with odoo.registry(self.dbname).cursor() as cr:
+            env = api.Environment(cr, SUPERUSER_ID, {})
+            params = env['ir.config_parameter'].sudo()
+            return {
+                'enabled': str2bool(params.get_param('mes_core.fsm_push_enabled', 'False')),
+                'debounce': int(params.get_param('mes_core.fsm_push_debounce_ms', 1000)) / 1000.0,
+                'conn': env['mes.timescale.base']._get_connection_params(),
+            }
+
+    def _listen(self, cfg):
+        conn = psycopg2.connect(**cfg['conn'])
+        conn.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+        try:
+            cur = conn.cursor()
+            cur.execute("SELECT pg_try_advisory_lock(%s)", (LOCK_KEY,))
+            if not cur.fetchone()[0]:
+                return
+            cur.execute(f"LISTEN {CHANNEL}")
+            _logger.info("FSM LISTENER | DB: %s | listening on %s", self.dbname, CHANNEL)
+
+            pending = set()
+            due = None
+            check_at = time.monotonic() + IDLE_SEC
+
+            while True:
+                timeout = max(due - time.monotonic(), 0) if due else IDLE_SEC
+                if select.select([conn], [], [], timeout) != ([], [], []):
+                    conn.poll()
+                    while conn.notifies:
+                        payload = conn.notifies.pop(0).payload
+                        if payload.isdigit():
+                            pending.add(int(payload))
+                    if pending and due is None:
+                        due = time.monotonic() + cfg['debounce']
+
+                now = time.monotonic()
+                if due and now >= due:
+                    cur.execute("SELECT DISTINCT machine_name FROM signal_dict WHERE signal_id = ANY(%s)", (list(pending),))
+                    mac_names = [r[0] for r in cur.fetchall()]
+                    pending.clear()
+                    due = None
+                    self._dispatch(mac_names)
+
+                if now >= check_at:
+                    cfg = self._load_config()
+                    if not cfg['enabled']:
+                        return
+                    check_at = now + IDLE_SEC
+        finally:
+            conn.close()
+
+    def _dispatch(self, mac_names):
+        if not mac_names:
+            return
+        with odoo.registry(self.dbname).cursor() as cr:
+            env = api.Environment(cr, SUPERUSER_ID, {})
+            env['mes.machine.performance'].enqueue_fsm_for_machines(mac_names)
+
+
+def start_listener(dbname):
+    if config['test_enable'] or config['stop_after_init']:
+        return
+    with _listeners_lock:
+        thread = _listeners.get(dbname)
+        if thread and thread.is_alive():
+            return
+        thread = FsmListener(dbname)
+        _listeners[dbname] = thread
+        thread.start()
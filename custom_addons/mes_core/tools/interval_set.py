@@ -0,0 +1,98 @@
+import numpy as np
+
+
+def to_us(values):
+    return np.asarray(values, dtype='datetime64[us]').astype(np.int64)
+
+
+def from_us(values):
+    return np.asarray(values, dtype=np.int64).astype('datetime64[us]').astype(object).tolist()
+
+
+def clip_arrays(starts, ends, lo, hi):
+    s = np.maximum(starts, lo)
+    e = np.minimum(ends, hi)
+    idx = np.flatnonzero(s < e)
+    return idx, s[idx], e[idx]
+
+
+class IntervalSet:
+    __slots__ = ('starts', 'ends')
+
+    def __init__(self, starts=None, ends=None, normalized=False):
+        s = np.asarray(starts if starts is not None else [], dtype=np.int64)
+        e = np.asarray(ends if ends is not None else [], dtype=np.int64)
+        if normalized:
+            self.starts, self.ends = s, e
+        else:
+            self.starts, self.ends = self._normalize(s, e)
+
+    @classmethod
+    def from_pairs(cls, pairs):
+        pairs = [(s, e) for s, e in pairs if s and e]
+        if not pairs:
+            return cls()
+        starts, ends = zip(*pairs)
+        return cls(to_us(starts), to_us(ends))
+
+    @classmethod
+    def span(cls, lo, hi):
+        return cls(to_us([lo]), to_us([hi]))
+
+    @staticmethod
+    def _normalize(s, e):
+        keep = s < e
+        s, e = s[keep], e[keep]
+        if not len(s):
+            return s, e
+        order = np.argsort(s, kind='stable')
+        s, e = s[order], np.maximum.accumulate(e[order])
+        brk = np.flatnonzero(s[1:] > e[:-1])
+        first = np.concatenate(([0], brk + 1))
+        last = np.concatenate((brk, [len(s) - 1]))
+        return s[first], e[last]
+
+    def _sweep(self, other, pred):
+        pts = np.concatenate((self.starts, self.ends, other.starts, other.ends))
+        if not len(pts):
+            return IntervalSet()
+        n, m = len(self.starts), len(other.starts)
+        d_a = np.concatenate((np.ones(n, np.int64), -np.ones(n, np.int64), np.zeros(2 * m, np.int64)))
+        d_b = np.concatenate((np.zeros(2 * n, np.int64), np.ones(m, np.int64), -np.ones(m, np.int64)))
+
+        order = np.argsort(pts, kind='stable')
+        pts = pts[order]
+        keep = pred(np.cumsum(d_a[order]), np.cumsum(d_b[order]))[:-1] & (pts[1:] > pts[:-1])
+        return IntervalSet(pts[:-1][keep], pts[1:][keep])
+
+    def union(self, other):
+        return IntervalSet(np.concatenate((self.starts, other.starts)), np.concatenate((self.ends, other.ends)))
+
+    def intersect(self, other):
+        return self._sweep(other, lambda a, b: (a > 0) & (b > 0))
+
+    def subtract(self, other):
+        return self._sweep(other, lambda a, b: (a > 0) & (b == 0))
+
+    def window(self, lo, hi):
+        lo_us, hi_us = to_us([lo, hi])
+        i0 = np.searchsorted(self.ends, lo_us, side='right')
+        i1 = np.searchsorted(self.starts, hi_us, side='left')
+        return IntervalSet(self.starts[i0:i1], self.ends[i0:i1], normalized=True)
+
+    def clip(self, lo, hi):
+        lo_us, hi_us = to_us([lo, hi])
+        _idx, s, e = clip_arrays(self.starts, self.ends, lo_us, hi_us)
+        return IntervalSet(s, e, normalized=True)
+
+    def duration(self):
+        return float((self.ends - self.starts).sum()) / 1e6
+
+    def to_pairs(self):
+        return list(zip(from_us(self.starts), from_us(self.ends)))
+
+    def __len__(self):
+        return len(self.starts)
+
+    def __bool__(self):
+        return bool(len(self.starts))
@@ -1,9 +1,11 @@
 import logging
 from datetime import timedelta
+import numpy as np
 import pyodbc
 
 from odoo import models, fields, api
 from odoo.exceptions import UserError
+from odoo.addons.mes_core.tools.interval_set import to_us, from_us, clip_arrays
 
 _logger = logging.getLogger(__name__)
 
@@ -151,33 +153,27 @@ class ExternalImportWizard(models.TransientModel):
             events_by_asset.setdefault(ev.AssetCode, []).append(ev)
 
         current_time = fields.Datetime.now()
+        reports_by_asset = {}
+        for r_data in reports.values():
+            reports_by_asset.setdefault(r_data['asset_code'], []).append(r_data)
+
         for asset, ev_list in events_by_asset.items():
-            for i in range(len(ev_list)):
-                ev = ev_list[i]
-                next_ev = ev_list[i+1] if i < len(ev_list) - 1 else None
-                raw_end = next_ev.StartTime if next_ev else None
-
-                for r_key, r_data in reports.items():
-                    if r_data['asset_code'] != asset:
-                        continue
-                    
-                    calc_end = raw_end
-                    if not calc_end:
-                        calc_end = current_time if r_data['end_time'] > current_time else r_data['end_time']
-
-                    if ev.StartTime < r_data['end_time'] and calc_end > r_data['start_time']:
-                        start_val = max(ev.StartTime, r_data['start_time'])
-                        end_val = min(calc_end, r_data['end_time'])
-                        
-                        if end_val > start_val:
-                            r_data['alarms'].append({
-                                'code': ev.AlarmCode,
-                                'name': ev.Alarm,
-                                'type': ev.AlarmType,
-                                'start': start_val,
-                                'end': end_val,
-                                'comment': ev.Comment
-                            })
+            ev_s = to_us([ev.StartTime for ev in ev_list])
+            for r_data in reports_by_asset.get(asset, []):
+                r_s, r_e = to_us([r_data['start_time'], r_data['end_time']])
+                ev_e = np.append(ev_s[1:], to_us([min(current_time, r_data['end_time'])]))
+
+                idx, s_arr, e_arr = clip_arrays(ev_s, ev_e, r_s, r_e)
+                for i, start_val, end_val in zip(idx, from_us(s_arr), from_us(e_arr)):
+                    ev = ev_list[i]
+                    r_data['alarms'].append({
+                        'code': ev.AlarmCode,
+                        'name': ev.Alarm,
+                        'type': ev.AlarmType,
+                        'start': start_val,
+                        'end': end_val,
+                        'comment': ev.Comment
+                    })
 
         cursor.execute(QUERY_COUNTS, (min_date, max_date))
         counts_raw = cursor.fetchall()
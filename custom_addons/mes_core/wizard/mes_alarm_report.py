@@ -41,9 +41,7 @@ class MesAlarmReportWizard(models.TransientModel):
             workcenter = self.env['mrp.workcenter'].search([('machine_settings_id', '=', machine.id)], limit=1)
             if not workcenter: continue
 
-            tz_name = workcenter.company_id.tz or 'UTC'
-            shifts = self.env['mes.shift'].search([('company_id', '=', workcenter.company_id.id)], order='start_hour asc')
-            periods_dict = self._get_logical_periods(self.start_datetime, self.end_datetime, shifts, tz_name)
+            periods_dict = self._get_logical_periods(self.start_datetime, self.end_datetime, workcenter)
 
             for p_name, time_blocks in periods_dict.items():
                 if not time_blocks: continue
@@ -47,9 +47,7 @@ class MesAnalyticsWizard(models.TransientModel):
             workcenter = self.env['mrp.workcenter'].search([('machine_settings_id', '=', machine.id)], limit=1)
             if not workcenter: continue
             
-            tz_name = workcenter.company_id.tz or 'UTC'
-            shifts = self.env['mes.shift'].search([('company_id', '=', workcenter.company_id.id)], order='sequence, start_hour asc')
-            periods_dict = self._get_logical_periods(self.start_datetime, self.end_datetime, shifts, tz_name)
+            periods_dict = self._get_logical_periods(self.start_datetime, self.end_datetime, workcenter)
 
             for p_name, time_blocks in periods_dict.items():
                 if not time_blocks: continue
@@ -89,8 +87,10 @@ class MesAnalyticsWizard(models.TransientModel):
 
                     doc = self.env['mes.machine.performance'].search([
                         ('machine_id', '=', workcenter.id),
-                        ('state', '=', 'done')
-                    ]).filtered(lambda d: d._get_utc_time(d._get_local_shift_times()[0]) <= p_start and d._get_utc_time(d._get_local_shift_times()[1]) >= p_end)
+                        ('state', '=', 'done'),
+                        ('start_utc', '<=', p_start),
+                        ('end_utc', '>=', p_end)
+                    ])
 
                     rej_stats = {}
                     if doc:
@@ -1,10 +1,7 @@
-import threading
-import odoo
 import pytz
 import logging
-import traceback
-from datetime import datetime, timedelta, time
 from odoo import models, fields, api
+from odoo.addons.mes_core.tools.fsm_core import IntervalBuilder
 
 _logger = logging.getLogger(__name__)
 
@@ -17,78 +14,22 @@ class MesHistPerformanceWiz(models.TransientModel):
     machine_ids = fields.Many2many('mrp.workcenter', string='Machines', required=True)
 
     def action_generate(self):
-        db_name = self.env.cr.dbname
-        uid = self.env.uid
-        context = self.env.context.copy()
-        
-        _logger.info("WIZARD_INIT: Starting thread for %s machines", len(self.machine_ids))
-        
-        thread = threading.Thread(
-            target=self._run_in_background,
-            args=(db_name, uid, context, self.start_date, self.end_date, self.machine_ids.ids)
-        )
-        thread.start()
+        run = self.env['mes.regen.run'].create({
+            'start_date': self.start_date,
+            'end_date': self.end_date,
+            'machine_ids': [(6, 0, self.machine_ids.ids)],
+        })
+        run.action_start()
+        _logger.info("WIZARD_INIT: %s queued %s chunks for %s machines", run.name, len(run.chunk_ids), len(self.machine_ids))
 
         return {
-            'type': 'ir.actions.client',
-            'tag': 'display_notification',
-            'params': {
-                'title': 'Background Process Started',
-                'message': 'Check server logs for WIZARD tags to monitor progress.',
-                'sticky': False,
-                'type': 'success',
-            }
+            'type': 'ir.actions.act_window',
+            'res_model': 'mes.regen.run',
+            'res_id': run.id,
+            'view_mode': 'form',
+            'target': 'current',
         }
 
-    @api.model
-    def _run_in_background(self, db_name, uid, context, start_date, end_date, machine_ids):
-        registry = odoo.registry(db_name)
-        
-        with registry.cursor() as cr:
-            env = api.Environment(cr, uid, context)
-            now_utc = fields.Datetime.now()
-            
-            try:
-                queue = []
-                wcs = env['mrp.workcenter'].browse(machine_ids)
-                
-                for wc in wcs:
-                    shifts = env['mes.shift'].search([('company_id', '=', wc.company_id.id)])
-                    val_shifts = shifts.filtered(lambda s: not s.workcenter_ids or wc.id in s.workcenter_ids.ids)
-                    
-                    curr_t = start_date
-                    while curr_t <= end_date:
-                        for shift in val_shifts:
-                            s_loc, e_loc = self._calc_window(shift, curr_t.date())
-                            s_utc = self._get_utc(wc, s_loc)
-                            e_utc = self._get_utc(wc, e_loc)
-
-                            if start_date <= s_utc <= end_date:
-                                queue.append({
-                                    'wc_id': wc.id,
-                                    'shift_id': shift.id,
-                                    'tgt_date': curr_t.date(),
-                                    's_utc': s_utc, 'e_utc': e_utc,
-                                    's_loc': s_loc, 'e_loc': e_loc
-                                })
-                        curr_t += timedelta(days=1)
-                        
-                queue.sort(key=lambda x: x['s_utc'])
-                
-                _logger.info("WIZARD_QUEUE: Built queue with %s shift windows to process", len(queue))
-
-                for item in queue:
-                    self._process_single_shift_fsm(env, item, now_utc)
-                    cr.commit() 
-                    env.clear()  
-                    
-                _logger.info("WIZARD_COMPLETE: All items processed successfully")
-                    
-            except Exception as e:
-                cr.rollback()
-                error_msg = f"WIZARD_FAULT: Critical failure in background thread!\nError: {str(e)}\n{traceback.format_exc()}"
-                _logger.error(error_msg)
-
     @api.model
     def _process_single_shift_fsm(self, env, item, now_utc):
         wc = env['mrp.workcenter'].browse(item['wc_id'])
@@ -102,9 +43,12 @@ class MesHistPerformanceWiz(models.TransientModel):
         calc_e_loc = self._get_local(wc, calc_e_utc)
 
         doc = self._prepare_doc(env, wc, shift, item['tgt_date'])
-        perf_model = env['mes.machine.performance']
         mac = wc.machine_settings_id
 
+        b_size = int(env['ir.config_parameter'].sudo().get_param('mes_core.fsm_batch_size', 5000))
+        builder = IntervalBuilder(min_sec=wc.fsm_min_state_sec, hyst_sec=wc.fsm_hysteresis_sec)
+        trans_map, reason_map = {}, {}
+
         last_reason_val = 0
         with env['mes.timescale.base']._connection() as conn:
             with conn.cursor() as cur:
@@ -132,39 +76,42 @@ class MesHistPerformanceWiz(models.TransientModel):
                     """, (mac.name, s_loc.strftime('%Y-%m-%d %H:%M:%S.%f')))
                 baseline = cur.fetchone()
 
-                cur.execute("""
+            if baseline:
+                _, tag, val = baseline
+                tgt_model, evt_id = self._map_state(env, wc, trans_map, reason_map, tag, val, last_reason_val)
+                    
+                if tgt_model and evt_id:
+                    builder.transition(tgt_model, evt_id, s_utc, doc.id)
+
+            with conn.cursor(name=f"mes_replay_{wc.id}") as s_cur:
+                s_cur.itersize = b_size
+                s_cur.execute("""
                     SELECT time, tag_name, value 
-                    FROM telemetry_event 
-                    WHERE machine_name = %s AND time > %s AND time <= %s 
+                    FROM machine_state_changes(%s, %s, %s) 
                     ORDER BY time ASC
                 """, (mac.name, s_loc.strftime('%Y-%m-%d %H:%M:%S.%f'), calc_e_loc.strftime('%Y-%m-%d %H:%M:%S.%f')))
-                events = cur.fetchall()
 
-        active_state = None
+                while True:
+                    rows = s_cur.fetchmany(b_size)
+                    if not rows:
+                        break
+                    last_reason_val = self._replay_rows(env, wc, doc, builder, trans_map, reason_map, rows, last_reason_val)
+                    builder.flush(env)
 
-        if baseline:
-            _, tag, val = baseline
-            if wc.telemetry_state_logic == 'states':
-                plc_val = int(val) if val is not None else 0
-                if plc_val == 1:
-                    tgt_model = 'mes.performance.alarm'
-                    evt = perf_model._resolve_event(mac, 'OEE.nStopRootReason', int(last_reason_val) if last_reason_val is not None else 0)
-                    evt_id = evt.id if evt else None
-                else:
-                    tgt_model, evt_id = perf_model.classify_fsm_transition(wc, tag, val)
+        if not is_cur:
+            builder.close(calc_e_utc)
+        builder.flush(env)
+
+        if not is_cur:
+            self._process_shift_counts(env, doc, wc, s_loc, e_loc)
+
+            if self._is_empty_doc(doc):
+                doc.unlink()
             else:
-                tgt_model, evt_id = perf_model.classify_fsm_transition(wc, tag, val)
-                
-            if tgt_model and evt_id:
-                active_state = env[tgt_model].create({
-                    'performance_id': doc.id,
-                    'loss_id': evt_id,
-                    'start_time': s_utc
-                })
+                doc.write({'state': 'done'})
 
-        for row in events:
-            ts_raw, tag, val = row
-            
+    def _replay_rows(self, env, wc, doc, builder, trans_map, reason_map, rows, last_reason_val):
+        for ts_raw, tag, val in rows:
             if isinstance(ts_raw, str):
                 ts_dt = fields.Datetime.to_datetime(ts_raw.replace('T', ' ').replace('Z', '')[:19])
             else:
@@ -175,49 +122,37 @@ class MesHistPerformanceWiz(models.TransientModel):
             if wc.telemetry_state_logic == 'states':
                 if tag == 'OEE.nStopRootReason':
                     last_reason_val = val
-                    if active_state and active_state._name == 'mes.performance.alarm':
-                        evt = perf_model._resolve_event(mac, tag, int(val) if val is not None else 0)
-                        if evt: active_state.write({'loss_id': evt.id})
+                    if builder.active and builder.active['model'] == 'mes.performance.alarm':
+                        evt_id = self._map_reason(env, wc, reason_map, val)
+                        if evt_id: builder.set_loss(evt_id)
                     continue
                 
                 if tag != 'OEE.nMachineState':
                     continue
-                    
-                plc_val = int(val) if val is not None else 0
-                if plc_val == 1:
-                    tgt_model = 'mes.performance.alarm'
-                    evt = perf_model._resolve_event(mac, 'OEE.nStopRootReason', int(last_reason_val) if last_reason_val is not None else 0)
-                    evt_id = evt.id if evt else None
-                else:
-                    tgt_model, evt_id = perf_model.classify_fsm_transition(wc, tag, val)
-            else:
-                tgt_model, evt_id = perf_model.classify_fsm_transition(wc, tag, val)
 
-            if not tgt_model or not evt_id:
-                continue
+            tgt_model, evt_id = self._map_state(env, wc, trans_map, reason_map, tag, val, last_reason_val)
 
-            if active_state and active_state._name == tgt_model and active_state.loss_id.id == evt_id:
+            if not tgt_model or not evt_id:
                 continue
 
-            if active_state:
-                active_state.write({'end_time': evt_utc})
-
-            active_state = env[tgt_model].create({
-                'performance_id': doc.id,
-                'loss_id': evt_id,
-                'start_time': evt_utc
-            })
-
-        if not is_cur:
-            if active_state:
-                active_state.write({'end_time': calc_e_utc})
-            
-            self._process_shift_counts(env, doc, wc, s_loc, e_loc)
-
-            if self._is_empty_doc(doc):
-                doc.unlink()
-            else:
-                doc.write({'state': 'done'})
+            builder.transition(tgt_model, evt_id, evt_utc, doc.id)
+        return last_reason_val
+
+    def _map_reason(self, env, wc, reason_map, val):
+        r_val = int(val) if val is not None else 0
+        if r_val not in reason_map:
+            evt = env['mes.machine.performance']._resolve_event(wc.machine_settings_id, 'OEE.nStopRootReason', r_val)
+            reason_map[r_val] = evt.id if evt else None
+        return reason_map[r_val]
+
+    def _map_state(self, env, wc, trans_map, reason_map, tag, val, last_reason_val):
+        if wc.telemetry_state_logic == 'states':
+            plc_val = int(val) if val is not None else 0
+            if plc_val == 1:
+                return 'mes.performance.alarm', self._map_reason(env, wc, reason_map, last_reason_val)
+        if (tag, val) not in trans_map:
+            trans_map[(tag, val)] = env['mes.machine.performance'].classify_fsm_transition(wc, tag, val)
+        return trans_map[(tag, val)]
 
     def _process_shift_counts(self, env, doc, wc, s_loc, e_loc):
         mac = wc.machine_settings_id
@@ -255,12 +190,6 @@ class MesHistPerformanceWiz(models.TransientModel):
         p_sum = sum(doc.production_ids.mapped('qty'))
         return r_sum <= 0 and p_sum <= 0
 
-    @api.model
-    def _calc_window(self, shift, target_date):
-        s_t = datetime.combine(target_date, time(hour=int(shift.start_hour), minute=int((shift.start_hour % 1) * 60)))
-        e_t = s_t + timedelta(hours=shift.duration)
-        return s_t, e_t
-
     @api.model
     def _get_utc(self, wc, loc_val):
         if not loc_val: return False
@@ -70,9 +70,7 @@ class MesRejectReportWizard(models.TransientModel):
             if not workcenter:
                 continue
                 
-            tz_name = workcenter.company_id.tz or 'UTC'
-            shifts = self.env['mes.shift'].search([('company_id', '=', workcenter.company_id.id)], order='start_hour asc')
-            periods_dict = self._get_logical_periods(self.start_datetime, self.end_datetime, shifts, tz_name)
+            periods_dict = self._get_logical_periods(self.start_datetime, self.end_datetime, workcenter)
 
             signals = machine.count_tag_ids
             if self.cnt_ids:
@@ -109,8 +107,10 @@ class MesRejectReportWizard(models.TransientModel):
 
                 doc = self.env['mes.machine.performance'].search([
                     ('machine_id', '=', workcenter.id),
-                    ('state', '=', 'done')
-                ]).filtered(lambda d: d._get_utc_time(d._get_local_shift_times()[0]) <= p_start and d._get_utc_time(d._get_local_shift_times()[1]) >= p_end)
+                    ('state', '=', 'done'),
+                    ('start_utc', '<=', p_start),
+                    ('end_utc', '>=', p_end)
+                ])
 
                 if doc:
                     valid_count_ids = signals.mapped('count_id').ids
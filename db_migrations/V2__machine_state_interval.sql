@@ -0,0 +1,102 @@
+CREATE TABLE IF NOT EXISTS machine_state_interval (
+    machine_name TEXT NOT NULL,
+    tag_name TEXT NOT NULL,
+    value INTEGER,
+    start_time TIMESTAMPTZ NOT NULL,
+    end_time TIMESTAMPTZ
+);
+SELECT create_hypertable('machine_state_interval', 'start_time', if_not_exists => TRUE);
+
+CREATE INDEX IF NOT EXISTS idx_msi_machine_start ON machine_state_interval (machine_name, start_time DESC);
+
+CREATE TABLE IF NOT EXISTS machine_state_watermark (
+    id INTEGER PRIMARY KEY DEFAULT 1 CHECK (id = 1),
+    last_event_id BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMPTZ
+);
+INSERT INTO machine_state_watermark (id) VALUES (1) ON CONFLICT DO NOTHING;
+
+CREATE INDEX IF NOT EXISTS idx_tel_evt_id ON telemetry_event (id);
+
+CREATE OR REPLACE PROCEDURE refresh_machine_state_interval(job_id INT, config JSONB)
+LANGUAGE plpgsql AS $$
+DECLARE
+    v_lookback INTERVAL := COALESCE(config->>'lookback', '14 days')::INTERVAL;
+    v_overlap BIGINT := COALESCE((config->>'overlap')::BIGINT, 1000);
+    v_from BIGINT;
+    v_to BIGINT;
+    v_start TIMESTAMPTZ;
+    r RECORD;
+BEGIN
+    SELECT last_event_id INTO v_from FROM machine_state_watermark WHERE id = 1 FOR UPDATE;
+
+    SELECT max(id) INTO v_to FROM telemetry_event WHERE time > now() - v_lookback;
+    IF v_to IS NULL OR v_to <= v_from THEN
+        RETURN;
+    END IF;
+
+    FOR r IN
+        SELECT machine_name, min(time) AS min_time
+        FROM telemetry_event
+        WHERE id > v_from - v_overlap AND id <= v_to AND time > now() - v_lookback
+        GROUP BY machine_name
+    LOOP
+        SELECT max(start_time) INTO v_start
+        FROM machine_state_interval
+        WHERE machine_name = r.machine_name AND start_time <= r.min_time;
+        v_start := COALESCE(v_start, r.min_time);
+
+        DELETE FROM machine_state_interval
+        WHERE machine_name = r.machine_name AND start_time >= v_start;
+
+        INSERT INTO machine_state_interval (machine_name, tag_name, value, start_time, end_time)
+        SELECT r.machine_name, c.tag_name, c.value, c.time, LEAD(c.time) OVER (ORDER BY c.time, c.id)
+        FROM (
+            SELECT e.id, e.time, e.tag_name, e.value,
+                   LAG(e.tag_name) OVER w AS p_tag,
+                   LAG(e.value) OVER w AS p_val
+            FROM telemetry_event e
+            WHERE e.machine_name = r.machine_name AND e.time >= v_start
+            WINDOW w AS (ORDER BY e.time, e.id)
+        ) c
+        WHERE c.p_tag IS NULL OR c.p_tag <> c.tag_name OR c.p_val IS DISTINCT FROM c.value;
+    END LOOP;
+
+    UPDATE machine_state_watermark SET last_event_id = v_to, updated_at = now() WHERE id = 1;
+END $$;
+
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM timescaledb_information.jobs WHERE proc_name = 'refresh_machine_state_interval') THEN
+        PERFORM add_job('refresh_machine_state_interval', '1 minute', config => '{"lookback": "14 days", "overlap": 1000}');
+    END IF;
+END $$;
+
+CREATE OR REPLACE FUNCTION machine_state_changes(p_machine TEXT, p_from TIMESTAMPTZ, p_to TIMESTAMPTZ)
+RETURNS TABLE (time TIMESTAMPTZ, tag_name TEXT, value INTEGER)
+LANGUAGE sql STABLE AS $$
+    WITH wm AS (
+        SELECT max(i.start_time) AS last_start
+        FROM machine_state_interval i
+        WHERE i.machine_name = p_machine
+    ),
+    mat AS (
+        SELECT i.start_time AS time, i.tag_name, i.value
+        FROM machine_state_interval i
+        WHERE i.machine_name = p_machine AND i.start_time > p_from AND i.start_time <= p_to
+    ),
+    tail AS (
+        SELECT e.time, e.tag_name, e.value,
+               LAG(e.tag_name) OVER w AS p_tag,
+               LAG(e.value) OVER w AS p_val
+        FROM telemetry_event e, wm
+        WHERE e.machine_name = p_machine
+          AND e.time > GREATEST(p_from, COALESCE(wm.last_start, p_from))
+          AND e.time <= p_to
+        WINDOW w AS (ORDER BY e.time, e.id)
+    )
+    SELECT m.time, m.tag_name, m.value FROM mat m
+    UNION ALL
+    SELECT t.time, t.tag_name, t.value FROM tail t
+    WHERE t.p_tag IS NULL OR t.p_tag <> t.tag_name OR t.p_val IS DISTINCT FROM t.value
+$$;
@@ -0,0 +1,358 @@
+CREATE TABLE IF NOT EXISTS signal_dict (
+    signal_id SERIAL PRIMARY KEY,
+    machine_name TEXT NOT NULL,
+    tag_name TEXT NOT NULL,
+    CONSTRAINT uniq_signal_dict UNIQUE (machine_name, tag_name)
+);
+
+INSERT INTO signal_dict (machine_name, tag_name)
+SELECT machine_name, tag_name FROM config_signals
+ON CONFLICT (machine_name, tag_name) DO NOTHING;
+
+INSERT INTO signal_dict (machine_name, tag_name)
+SELECT DISTINCT machine_name, tag_name FROM telemetry_event
+UNION
+SELECT DISTINCT machine_name, tag_name FROM telemetry_count
+UNION
+SELECT DISTINCT machine_name, tag_name FROM telemetry_process
+ON CONFLICT (machine_name, tag_name) DO NOTHING;
+
+CREATE OR REPLACE FUNCTION signal_id_of(p_machine TEXT, p_tag TEXT)
+RETURNS INTEGER
+LANGUAGE plpgsql AS $$
+DECLARE
+    v_id INTEGER;
+BEGIN
+    SELECT signal_id INTO v_id FROM signal_dict WHERE machine_name = p_machine AND tag_name = p_tag;
+    IF v_id IS NULL THEN
+        INSERT INTO signal_dict (machine_name, tag_name) VALUES (p_machine, p_tag)
+        ON CONFLICT (machine_name, tag_name) DO NOTHING
+        RETURNING signal_id INTO v_id;
+        IF v_id IS NULL THEN
+            SELECT signal_id INTO v_id FROM signal_dict WHERE machine_name = p_machine AND tag_name = p_tag;
+        END IF;
+    END IF;
+    RETURN v_id;
+END $$;
+
+CREATE OR REPLACE FUNCTION config_signals_to_dict() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    PERFORM signal_id_of(NEW.machine_name, NEW.tag_name);
+    RETURN NEW;
+END $$;
+
+DROP TRIGGER IF EXISTS trg_config_signals_dict ON config_signals;
+CREATE TRIGGER trg_config_signals_dict
+AFTER INSERT OR UPDATE OF machine_name, tag_name ON config_signals
+FOR EACH ROW EXECUTE FUNCTION config_signals_to_dict();
+
+CREATE TABLE IF NOT EXISTS telemetry_count_raw (
+    id BIGINT NOT NULL,
+    time TIMESTAMPTZ NOT NULL,
+    arrived_time TIMESTAMPTZ NOT NULL,
+    signal_id INTEGER NOT NULL,
+    value BIGINT,
+    evt_id VARCHAR(64)
+);
+SELECT create_hypertable('telemetry_count_raw', 'time', if_not_exists => TRUE);
+
+CREATE TABLE IF NOT EXISTS telemetry_event_raw (
+    id BIGINT NOT NULL,
+    time TIMESTAMPTZ NOT NULL,
+    arrived_time TIMESTAMPTZ NOT NULL,
+    signal_id INTEGER NOT NULL,
+    value INTEGER,
+    evt_id VARCHAR(64)
+);
+SELECT create_hypertable('telemetry_event_raw', 'time', if_not_exists => TRUE);
+
+CREATE TABLE IF NOT EXISTS telemetry_process_raw (
+    id BIGINT NOT NULL,
+    time TIMESTAMPTZ NOT NULL,
+    arrived_time TIMESTAMPTZ NOT NULL,
+    signal_id INTEGER NOT NULL,
+    value DOUBLE PRECISION,
+    value_str TEXT,
+    evt_id VARCHAR(64)
+);
+SELECT create_hypertable('telemetry_process_raw', 'time', if_not_exists => TRUE);
+
+INSERT INTO telemetry_count_raw (id, time, arrived_time, signal_id, value, evt_id)
+SELECT t.id, t.time, t.arrived_time, d.signal_id, t.value, t.evt_id
+FROM telemetry_count t
+JOIN signal_dict d ON d.machine_name = t.machine_name AND d.tag_name = t.tag_name;
+
+INSERT INTO telemetry_event_raw (id, time, arrived_time, signal_id, value, evt_id)
+SELECT t.id, t.time, t.arrived_time, d.signal_id, t.value, t.evt_id
+FROM telemetry_event t
+JOIN signal_dict d ON d.machine_name = t.machine_name AND d.tag_name = t.tag_name;
+
+INSERT INTO telemetry_process_raw (id, time, arrived_time, signal_id, value, value_str, evt_id)
+SELECT t.id, t.time, t.arrived_time, d.signal_id, t.value, t.value_str, t.evt_id
+FROM telemetry_process t
+JOIN signal_dict d ON d.machine_name = t.machine_name AND d.tag_name = t.tag_name;
+
+ALTER SEQUENCE telemetry_count_id_seq OWNED BY NONE;
+ALTER SEQUENCE telemetry_event_id_seq OWNED BY NONE;
+ALTER SEQUENCE telemetry_process_id_seq OWNED BY NONE;
+
+DROP VIEW IF EXISTS view_mes_anomalies;
+DROP MATERIALIZED VIEW IF EXISTS telemetry_hourly_stats;
+DROP TABLE IF EXISTS telemetry_count;
+DROP TABLE IF EXISTS telemetry_event;
+DROP TABLE IF EXISTS telemetry_process;
+
+ALTER TABLE telemetry_count_raw ALTER COLUMN id SET DEFAULT nextval('telemetry_count_id_seq');
+ALTER TABLE telemetry_event_raw ALTER COLUMN id SET DEFAULT nextval('telemetry_event_id_seq');
+ALTER TABLE telemetry_process_raw ALTER COLUMN id SET DEFAULT nextval('telemetry_process_id_seq');
+ALTER SEQUENCE telemetry_count_id_seq OWNED BY telemetry_count_raw.id;
+ALTER SEQUENCE telemetry_event_id_seq OWNED BY telemetry_event_raw.id;
+ALTER SEQUENCE telemetry_process_id_seq OWNED BY telemetry_process_raw.id;
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_tel_cnt_raw_uniq ON telemetry_count_raw (signal_id, time, evt_id);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_tel_evt_raw_uniq ON telemetry_event_raw (signal_id, time, evt_id);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_tel_prc_raw_uniq ON telemetry_process_raw (signal_id, time, evt_id);
+CREATE INDEX IF NOT EXISTS idx_tel_evt_raw_id ON telemetry_event_raw (id);
+
+CREATE OR REPLACE VIEW telemetry_count AS
+SELECT r.id, r.time, r.arrived_time, d.machine_name, d.tag_name, r.value, r.evt_id, r.signal_id
+FROM telemetry_count_raw r
+JOIN signal_dict d ON d.signal_id = r.signal_id;
+ALTER VIEW telemetry_count ALTER COLUMN id SET DEFAULT nextval('telemetry_count_id_seq');
+
+CREATE OR REPLACE VIEW telemetry_event AS
+SELECT r.id, r.time, r.arrived_time, d.machine_name, d.tag_name, r.value, r.evt_id, r.signal_id
+FROM telemetry_event_raw r
+JOIN signal_dict d ON d.signal_id = r.signal_id;
+ALTER VIEW telemetry_event ALTER COLUMN id SET DEFAULT nextval('telemetry_event_id_seq');
+
+CREATE OR REPLACE VIEW telemetry_process AS
+SELECT r.id, r.time, r.arrived_time, d.machine_name, d.tag_name, r.value, r.value_str, r.evt_id, r.signal_id
+FROM telemetry_process_raw r
+JOIN signal_dict d ON d.signal_id = r.signal_id;
+ALTER VIEW telemetry_process ALTER COLUMN id SET DEFAULT nextval('telemetry_process_id_seq');
+
+CREATE OR REPLACE FUNCTION telemetry_count_ins() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    INSERT INTO telemetry_count_raw (id, time, arrived_time, signal_id, value, evt_id)
+    VALUES (NEW.id, NEW.time, NEW.arrived_time, signal_id_of(NEW.machine_name, NEW.tag_name), NEW.value, NEW.evt_id)
+    ON CONFLICT DO NOTHING;
+    RETURN NEW;
+END $$;
+
+CREATE OR REPLACE FUNCTION telemetry_event_ins() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    INSERT INTO telemetry_event_raw (id, time, arrived_time, signal_id, value, evt_id)
+    VALUES (NEW.id, NEW.time, NEW.arrived_time, signal_id_of(NEW.machine_name, NEW.tag_name), NEW.value, NEW.evt_id)
+    ON CONFLICT DO NOTHING;
+    RETURN NEW;
+END $$;
+
+CREATE OR REPLACE FUNCTION telemetry_process_ins() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    INSERT INTO telemetry_process_raw (id, time, arrived_time, signal_id, value, value_str, evt_id)
+    VALUES (NEW.id, NEW.time, NEW.arrived_time, signal_id_of(NEW.machine_name, NEW.tag_name), NEW.value, NEW.value_str, NEW.evt_id)
+    ON CONFLICT DO NOTHING;
+    RETURN NEW;
+END $$;
+
+DROP TRIGGER IF EXISTS trg_telemetry_count_ins ON telemetry_count;
+CREATE TRIGGER trg_telemetry_count_ins INSTEAD OF INSERT ON telemetry_count
+FOR EACH ROW EXECUTE FUNCTION telemetry_count_ins();
+
+DROP TRIGGER IF EXISTS trg_telemetry_event_ins ON telemetry_event;
+CREATE TRIGGER trg_telemetry_event_ins INSTEAD OF INSERT ON telemetry_event
+FOR EACH ROW EXECUTE FUNCTION telemetry_event_ins();
+
+DROP TRIGGER IF EXISTS trg_telemetry_process_ins ON telemetry_process;
+CREATE TRIGGER trg_telemetry_process_ins INSTEAD OF INSERT ON telemetry_process
+FOR EACH ROW EXECUTE FUNCTION telemetry_process_ins();
+
+CREATE MATERIALIZED VIEW IF NOT EXISTS telemetry_count_hourly
+WITH (timescaledb.continuous) AS
+SELECT
+    time_bucket('1 hour', time) as bucket,
+    signal_id,
+    COUNT(*) as total_events,
+    AVG(value) as avg_val,
+    MAX(value) as max_val,
+    MIN(value) as min_val
+FROM telemetry_count_raw
+GROUP BY bucket, signal_id
+WITH NO DATA;
+
+CREATE OR REPLACE VIEW telemetry_hourly_stats AS
+SELECT h.bucket, d.machine_name, d.tag_name, h.total_events, h.avg_val, h.max_val, h.min_val
+FROM telemetry_count_hourly h
+JOIN signal_dict d ON d.signal_id = h.signal_id;
+
+CREATE OR REPLACE VIEW view_mes_anomalies AS
+WITH last_hour AS (
+    SELECT machine_name, COUNT(*) as stops_count
+    FROM telemetry_event
+    WHERE time > NOW() - INTERVAL '1 hour' AND value = 0
+    GROUP BY machine_name
+),
+monthly_avg AS (
+    SELECT machine_name, COUNT(*) / 14.0 as avg_daily_stops
+    FROM telemetry_event
+    WHERE time > NOW() - INTERVAL '14 days' AND value = 0
+    GROUP BY machine_name
+)
+SELECT
+    row_number() OVER () as id,
+    lh.machine_name,
+    lh.stops_count as current_stops,
+    COALESCE(ma.avg_daily_stops, 0) as historical_avg,
+    CASE
+        WHEN lh.stops_count > (ma.avg_daily_stops / 24 * 1.5) THEN 'critical'
+        ELSE 'normal'
+    END as status
+FROM last_hour lh
+LEFT JOIN monthly_avg ma ON lh.machine_name = ma.machine_name;
+
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM timescaledb_information.compression_settings WHERE hypertable_name = 'telemetry_count_raw') THEN
+        ALTER TABLE telemetry_count_raw SET (
+            timescaledb.compress,
+            timescaledb.compress_segmentby = 'signal_id',
+            timescaledb.compress_orderby = 'time DESC'
+        );
+    END IF;
+END $$;
+SELECT add_compression_policy('telemetry_count_raw', INTERVAL '14 days', if_not_exists => TRUE);
+
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM timescaledb_information.compression_settings WHERE hypertable_name = 'telemetry_event_raw') THEN
+        ALTER TABLE telemetry_event_raw SET (
+            timescaledb.compress,
+            timescaledb.compress_segmentby = 'signal_id',
+            timescaledb.compress_orderby = 'time DESC'
+        );
+    END IF;
+END $$;
+SELECT add_compression_policy('telemetry_event_raw', INTERVAL '14 days', if_not_exists => TRUE);
+
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM timescaledb_information.compression_settings WHERE hypertable_name = 'telemetry_process_raw') THEN
+        ALTER TABLE telemetry_process_raw SET (
+            timescaledb.compress,
+            timescaledb.compress_segmentby = 'signal_id',
+            timescaledb.compress_orderby = 'time DESC'
+        );
+    END IF;
+END $$;
+SELECT add_compression_policy('telemetry_process_raw', INTERVAL '14 days', if_not_exists => TRUE);
+
+CREATE OR REPLACE PROCEDURE refresh_machine_state_interval(job_id INT, config JSONB)
+LANGUAGE plpgsql AS $$
+DECLARE
+    v_lookback INTERVAL := COALESCE(config->>'lookback', '14 days')::INTERVAL;
+    v_overlap BIGINT := COALESCE((config->>'overlap')::BIGINT, 1000);
+    v_from BIGINT;
+    v_to BIGINT;
+    v_start TIMESTAMPTZ;
+    v_sigs INTEGER[];
+    r RECORD;
+BEGIN
+    SELECT last_event_id INTO v_from FROM machine_state_watermark WHERE id = 1 FOR UPDATE;
+
+    SELECT max(id) INTO v_to FROM telemetry_event_raw WHERE time > now() - v_lookback;
+    IF v_to IS NULL OR v_to <= v_from THEN
+        RETURN;
+    END IF;
+
+    FOR r IN
+        SELECT d.machine_name, min(e.time) AS min_time
+        FROM telemetry_event_raw e
+        JOIN signal_dict d ON d.signal_id = e.signal_id
+        WHERE e.id > v_from - v_overlap AND e.id <= v_to
+        GROUP BY d.machine_name
+    LOOP
+        SELECT array_agg(signal_id) INTO v_sigs FROM signal_dict WHERE machine_name = r.machine_name;
+
+        SELECT max(start_time) INTO v_start
+        FROM machine_state_interval
+        WHERE machine_name = r.machine_name AND start_time <= r.min_time;
+        v_start := COALESCE(v_start, r.min_time);
+
+        DELETE FROM machine_state_interval
+        WHERE machine_name = r.machine_name AND start_time >= v_start;
+
+        INSERT INTO machine_state_interval (machine_name, tag_name, value, start_time, end_time)
+        SELECT r.machine_name, d.tag_name, c.value, c.time, LEAD(c.time) OVER (ORDER BY c.time, c.id)
+        FROM (
+            SELECT e.id, e.time, e.signal_id, e.value,
+                   LAG(e.signal_id) OVER w AS p_sig,
+                   LAG(e.value) OVER w AS p_val
+            FROM telemetry_event_raw e
+            WHERE e.signal_id = ANY(v_sigs) AND e.time >= v_start
+            WINDOW w AS (ORDER BY e.time, e.id)
+        ) c
+        JOIN signal_dict d ON d.signal_id = c.signal_id
+        WHERE c.p_sig IS NULL OR c.p_sig <> c.signal_id OR c.p_val IS DISTINCT FROM c.value;
+    END LOOP;
+
+    UPDATE machine_state_watermark SET last_event_id = v_to, updated_at = now() WHERE id = 1;
+END $$;
+
+UPDATE machine_state_watermark SET last_event_id = 0 WHERE id = 1;
+CALL refresh_machine_state_interval(NULL, '{"lookback": "1000 years", "overlap": 0}');
+
+CREATE OR REPLACE FUNCTION machine_state_changes(p_machine TEXT, p_from TIMESTAMPTZ, p_to TIMESTAMPTZ,
+                                                  p_margin INTERVAL DEFAULT '2 days')
+RETURNS TABLE (time TIMESTAMPTZ, tag_name TEXT, value INTEGER)
+LANGUAGE sql STABLE AS $$
+    WITH sigs AS (
+        SELECT sd.signal_id, sd.tag_name
+        FROM signal_dict sd
+        WHERE sd.machine_name = p_machine
+    ),
+    cut AS (
+        SELECT COALESCE(min(e.time), 'infinity'::TIMESTAMPTZ) AS t
+        FROM telemetry_event_raw e
+        WHERE e.signal_id IN (SELECT s.signal_id FROM sigs s)
+          AND e.id > (SELECT w.last_event_id FROM machine_state_watermark w WHERE w.id = 1)
+          AND e.time >= p_from - p_margin AND e.time <= p_to
+    ),
+    prev AS (
+        SELECT i.tag_name, i.value
+        FROM machine_state_interval i, cut
+        WHERE i.machine_name = p_machine AND i.start_time < cut.t
+        ORDER BY i.start_time DESC
+        LIMIT 1
+    ),
+    mat AS (
+        SELECT i.start_time AS time, i.tag_name, i.value
+        FROM machine_state_interval i, cut
+        WHERE i.machine_name = p_machine AND i.start_time > p_from AND i.start_time <= p_to
+          AND i.start_time < cut.t
+    ),
+    tail AS (
+        SELECT e.time, s.tag_name, e.value,
+               LAG(s.tag_name) OVER w AS p_tag,
+               LAG(e.value) OVER w AS p_val
+        FROM telemetry_event_raw e
+        JOIN sigs s ON s.signal_id = e.signal_id
+        CROSS JOIN cut
+        WHERE e.time >= cut.t AND e.time <= p_to
+        WINDOW w AS (ORDER BY e.time, e.id)
+    )
+    SELECT m.time, m.tag_name, m.value FROM mat m
+    UNION ALL
+    SELECT t.time, t.tag_name, t.value
+    FROM tail t
+    LEFT JOIN prev p ON TRUE
+    WHERE t.time > p_from
+      AND CASE
+            WHEN t.p_tag IS NULL THEN p.tag_name IS DISTINCT FROM t.tag_name OR p.value IS DISTINCT FROM t.value
+            ELSE t.p_tag <> t.tag_name OR t.p_val IS DISTINCT FROM t.value
+          END
+$$;
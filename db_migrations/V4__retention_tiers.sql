@@ -0,0 +1,48 @@
+CREATE MATERIALIZED VIEW IF NOT EXISTS telemetry_count_1m
+WITH (timescaledb.continuous) AS
+SELECT
+    time_bucket('1 minute', time) as bucket,
+    signal_id,
+    COUNT(*) as total_events,
+    SUM(value) as sum_val,
+    AVG(value) as avg_val,
+    MAX(value) as max_val,
+    MIN(value) as min_val
+FROM telemetry_count_raw
+GROUP BY bucket, signal_id
+WITH NO DATA;
+
+SELECT add_continuous_aggregate_policy('telemetry_count_1m',
+    start_offset => INTERVAL '2 hours',
+    end_offset => INTERVAL '1 minute',
+    schedule_interval => INTERVAL '1 minute',
+    if_not_exists => TRUE);
+
+SELECT add_continuous_aggregate_policy('telemetry_count_hourly',
+    start_offset => INTERVAL '3 days',
+    end_offset => INTERVAL '1 hour',
+    schedule_interval => INTERVAL '30 minutes',
+    if_not_exists => TRUE);
+
+CREATE OR REPLACE VIEW telemetry_count_1m_stats AS
+SELECT m.bucket, d.machine_name, d.tag_name, m.total_events, m.sum_val, m.avg_val, m.max_val, m.min_val
+FROM telemetry_count_1m m
+JOIN signal_dict d ON d.signal_id = m.signal_id;
+
+CREATE OR REPLACE VIEW view_mes_policy_status AS
+SELECT
+    j.job_id as id,
+    j.proc_name,
+    COALESCE(ca.view_name, j.hypertable_name) as relation_name,
+    j.schedule_interval::TEXT as schedule_interval,
+    j.config::TEXT as config,
+    j.scheduled,
+    s.last_run_status,
+    s.last_run_started_at,
+    s.last_successful_finish,
+    s.next_start,
+    s.total_runs,
+    s.total_failures
+FROM timescaledb_information.jobs j
+LEFT JOIN timescaledb_information.job_stats s ON s.job_id = j.job_id
+LEFT JOIN timescaledb_information.continuous_aggregates ca ON ca.materialization_hypertable_name = j.hypertable_name;
@@ -0,0 +1,108 @@
+CREATE MATERIALIZED VIEW IF NOT EXISTS telemetry_stops_hourly
+WITH (timescaledb.continuous, timescaledb.materialized_only = false) AS
+SELECT
+    time_bucket('1 hour', time) as bucket,
+    signal_id,
+    COUNT(*) as stops
+FROM telemetry_event_raw
+WHERE value = 0
+GROUP BY bucket, signal_id
+WITH NO DATA;
+
+SELECT add_continuous_aggregate_policy('telemetry_stops_hourly',
+    start_offset => INTERVAL '1 day',
+    end_offset => INTERVAL '1 hour',
+    schedule_interval => INTERVAL '30 minutes',
+    if_not_exists => TRUE);
+
+CREATE TABLE IF NOT EXISTS machine_stop_baseline (
+    machine_name TEXT NOT NULL,
+    hour_of_day SMALLINT NOT NULL,
+    mean_stops DOUBLE PRECISION NOT NULL DEFAULT 0,
+    var_stops DOUBLE PRECISION NOT NULL DEFAULT 0,
+    samples INTEGER NOT NULL DEFAULT 0,
+    updated_at TIMESTAMPTZ,
+    PRIMARY KEY (machine_name, hour_of_day)
+);
+
+CREATE TABLE IF NOT EXISTS machine_stop_baseline_watermark (
+    id INTEGER PRIMARY KEY DEFAULT 1 CHECK (id = 1),
+    last_bucket TIMESTAMPTZ
+);
+INSERT INTO machine_stop_baseline_watermark (id) VALUES (1) ON CONFLICT DO NOTHING;
+
+CREATE OR REPLACE PROCEDURE update_stop_baseline(job_id INT, config JSONB)
+LANGUAGE plpgsql AS $$
+DECLARE
+    v_alpha DOUBLE PRECISION := COALESCE((config->>'alpha')::DOUBLE PRECISION, 0.1);
+    v_boot INTERVAL := COALESCE(config->>'bootstrap', '14 days')::INTERVAL;
+    v_to TIMESTAMPTZ := date_trunc('hour', now());
+    v_from TIMESTAMPTZ;
+    r RECORD;
+BEGIN
+    SELECT last_bucket INTO v_from FROM machine_stop_baseline_watermark WHERE id = 1 FOR UPDATE;
+    v_from := COALESCE(v_from, date_trunc('hour', now() - v_boot) - INTERVAL '1 hour');
+
+    IF v_from + INTERVAL '1 hour' >= v_to THEN
+        RETURN;
+    END IF;
+
+    FOR r IN
+        SELECT m.machine_name, h.bucket, COALESCE(s.stops, 0) AS stops
+        FROM (SELECT DISTINCT machine_name FROM signal_dict) m
+        CROSS JOIN generate_series(v_from + INTERVAL '1 hour', v_to - INTERVAL '1 hour', INTERVAL '1 hour') AS h (bucket)
+        LEFT JOIN (
+            SELECT d.machine_name, c.bucket, SUM(c.stops) AS stops
+            FROM telemetry_stops_hourly c
+            JOIN signal_dict d ON d.signal_id = c.signal_id
+            WHERE c.bucket > v_from AND c.bucket < v_to
+            GROUP BY d.machine_name, c.bucket
+        ) s ON s.machine_name = m.machine_name AND s.bucket = h.bucket
+        ORDER BY h.bucket
+    LOOP
+        INSERT INTO machine_stop_baseline AS b (machine_name, hour_of_day, mean_stops, var_stops, samples, updated_at)
+        VALUES (r.machine_name, EXTRACT(hour FROM r.bucket), r.stops, 0, 1, now())
+        ON CONFLICT (machine_name, hour_of_day) DO UPDATE SET
+            mean_stops = b.mean_stops + v_alpha * (EXCLUDED.mean_stops - b.mean_stops),
+            var_stops = (1 - v_alpha) * (b.var_stops + v_alpha * power(EXCLUDED.mean_stops - b.mean_stops, 2)),
+            samples = b.samples + 1,
+            updated_at = now();
+    END LOOP;
+
+    UPDATE machine_stop_baseline_watermark SET last_bucket = v_to - INTERVAL '1 hour' WHERE id = 1;
+END $$;
+
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM timescaledb_information.jobs WHERE proc_name = 'update_stop_baseline') THEN
+        PERFORM add_job('update_stop_baseline', '1 hour', config => '{"alpha": 0.1, "bootstrap": "14 days"}');
+    END IF;
+END $$;
+
+CREATE OR REPLACE VIEW view_mes_anomalies AS
+WITH last_hour AS (
+    SELECT d.machine_name, COUNT(*) as stops_count
+    FROM telemetry_event_raw e
+    JOIN signal_dict d ON d.signal_id = e.signal_id
+    WHERE e.time > NOW() - INTERVAL '1 hour' AND e.value = 0
+    GROUP BY d.machine_name
+),
+base AS (
+    SELECT machine_name, mean_stops, sqrt(var_stops) as std_stops
+    FROM machine_stop_baseline
+    WHERE hour_of_day = EXTRACT(hour FROM NOW())
+)
+SELECT
+    row_number() OVER () as id,
+    COALESCE(b.machine_name, lh.machine_name) as machine_name,
+    COALESCE(lh.stops_count, 0) as current_stops,
+    COALESCE(b.mean_stops, 0) as historical_avg,
+    COALESCE(b.std_stops, 0) as historical_std,
+    CASE
+        WHEN b.machine_name IS NULL THEN 'normal'
+        WHEN COALESCE(lh.stops_count, 0) > b.mean_stops + 3 * GREATEST(b.std_stops, 1) THEN 'critical'
+        WHEN COALESCE(lh.stops_count, 0) > b.mean_stops + 2 * GREATEST(b.std_stops, 1) THEN 'warning'
+        ELSE 'normal'
+    END as status
+FROM base b
+FULL JOIN last_hour lh ON lh.machine_name = b.machine_name;
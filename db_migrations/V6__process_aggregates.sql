@@ -0,0 +1,76 @@
+CREATE MATERIALIZED VIEW IF NOT EXISTS telemetry_process_1m
+WITH (timescaledb.continuous) AS
+SELECT
+    time_bucket('1 minute', time) as bucket,
+    signal_id,
+    COUNT(value) as sample_count,
+    AVG(value) as avg_val,
+    STDDEV_POP(value) as stddev_val,
+    MIN(value) as min_val,
+    MAX(value) as max_val,
+    percentile_cont(0.5) WITHIN GROUP (ORDER BY value) as p50,
+    percentile_cont(0.95) WITHIN GROUP (ORDER BY value) as p95,
+    percentile_cont(0.99) WITHIN GROUP (ORDER BY value) as p99
+FROM telemetry_process_raw
+GROUP BY bucket, signal_id
+WITH NO DATA;
+
+SELECT add_continuous_aggregate_policy('telemetry_process_1m',
+    start_offset => INTERVAL '2 hours',
+    end_offset => INTERVAL '1 minute',
+    schedule_interval => INTERVAL '1 minute',
+    if_not_exists => TRUE);
+
+CREATE MATERIALIZED VIEW IF NOT EXISTS telemetry_process_1h
+WITH (timescaledb.continuous) AS
+SELECT
+    time_bucket('1 hour', bucket) as bucket,
+    signal_id,
+    SUM(sample_count) as sample_count,
+    SUM(avg_val * sample_count) / NULLIF(SUM(sample_count), 0) as avg_val,
+    SQRT(GREATEST(
+        SUM(sample_count * (stddev_val * stddev_val + avg_val * avg_val)) / NULLIF(SUM(sample_count), 0)
+        - POWER(SUM(avg_val * sample_count) / NULLIF(SUM(sample_count), 0), 2),
+        0)) as stddev_val,
+    MIN(min_val) as min_val,
+    MAX(max_val) as max_val
+FROM telemetry_process_1m
+GROUP BY time_bucket('1 hour', bucket), signal_id
+WITH NO DATA;
+
+SELECT add_continuous_aggregate_policy('telemetry_process_1h',
+    start_offset => INTERVAL '3 days',
+    end_offset => INTERVAL '1 hour',
+    schedule_interval => INTERVAL '30 minutes',
+    if_not_exists => TRUE);
+
+CREATE OR REPLACE VIEW telemetry_process_1m_stats AS
+SELECT
+    (EXTRACT(EPOCH FROM m.bucket)::BIGINT / 60) * 100000 + m.signal_id as id,
+    m.bucket,
+    d.machine_name,
+    d.tag_name,
+    m.sample_count,
+    m.avg_val,
+    m.min_val,
+    m.max_val,
+    m.stddev_val,
+    m.p50,
+    m.p95,
+    m.p99
+FROM telemetry_process_1m m
+JOIN signal_dict d ON d.signal_id = m.signal_id;
+
+CREATE OR REPLACE VIEW telemetry_process_hourly_stats AS
+SELECT
+    (EXTRACT(EPOCH FROM h.bucket)::BIGINT / 3600) * 100000 + h.signal_id as id,
+    h.bucket,
+    d.machine_name,
+    d.tag_name,
+    h.sample_count::BIGINT as sample_count,
+    h.avg_val,
+    h.min_val,
+    h.max_val,
+    h.stddev_val
+FROM telemetry_process_1h h
+JOIN signal_dict d ON d.signal_id = h.signal_id;
@@ -0,0 +1,21 @@
+CREATE OR REPLACE FUNCTION notify_telemetry_event()
+RETURNS TRIGGER LANGUAGE plpgsql AS $$
+DECLARE
+    r RECORD;
+BEGIN
+    FOR r IN
+        SELECT min(n.signal_id) AS signal_id
+        FROM new_rows n
+        JOIN signal_dict d ON d.signal_id = n.signal_id
+        GROUP BY d.machine_name
+    LOOP
+        PERFORM pg_notify('telemetry_event', r.signal_id::TEXT);
+    END LOOP;
+    RETURN NULL;
+END $$;
+
+DROP TRIGGER IF EXISTS trg_notify_telemetry_event ON telemetry_event_raw;
+CREATE TRIGGER trg_notify_telemetry_event
+AFTER INSERT ON telemetry_event_raw
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION notify_telemetry_event();
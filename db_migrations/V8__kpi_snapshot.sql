@@ -0,0 +1,72 @@
+CREATE TABLE IF NOT EXISTS kpi_snapshot (
+    time TIMESTAMPTZ NOT NULL,
+    workcenter_id INTEGER NOT NULL,
+    oee DOUBLE PRECISION,
+    availability DOUBLE PRECISION,
+    performance DOUBLE PRECISION,
+    quality DOUBLE PRECISION,
+    produced DOUBLE PRECISION,
+    waste_losses DOUBLE PRECISION,
+    downtime_losses DOUBLE PRECISION,
+    runtime_sec DOUBLE PRECISION,
+    first_running_time TIMESTAMP,
+    top_alarm_id INTEGER,
+    top_alarm TEXT,
+    top_rejection TEXT
+);
+SELECT create_hypertable('kpi_snapshot', 'time', chunk_time_interval => INTERVAL '7 days', if_not_exists => TRUE);
+
+CREATE INDEX IF NOT EXISTS idx_kpi_snapshot_wc_time ON kpi_snapshot (workcenter_id, time DESC);
+
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM timescaledb_information.compression_settings WHERE hypertable_name = 'kpi_snapshot') THEN
+        ALTER TABLE kpi_snapshot SET (
+            timescaledb.compress,
+            timescaledb.compress_segmentby = 'workcenter_id',
+            timescaledb.compress_orderby = 'time DESC'
+        );
+    END IF;
+END $$;
+SELECT add_compression_policy('kpi_snapshot', INTERVAL '14 days', if_not_exists => TRUE);
+
+CREATE TABLE IF NOT EXISTS kpi_latest (
+    id INTEGER PRIMARY KEY,
+    workcenter_id INTEGER NOT NULL,
+    time TIMESTAMPTZ NOT NULL,
+    oee DOUBLE PRECISION,
+    availability DOUBLE PRECISION,
+    performance DOUBLE PRECISION,
+    quality DOUBLE PRECISION,
+    produced DOUBLE PRECISION,
+    waste_losses DOUBLE PRECISION,
+    downtime_losses DOUBLE PRECISION,
+    runtime_sec DOUBLE PRECISION,
+    first_running_time TIMESTAMP,
+    top_alarm_id INTEGER,
+    top_alarm TEXT,
+    top_rejection TEXT
+);
+
+INSERT INTO kpi_latest (id, workcenter_id, time, oee, availability, performance, quality, produced,
+                        waste_losses, downtime_losses, runtime_sec, first_running_time,
+                        top_alarm_id, top_alarm, top_rejection)
+SELECT DISTINCT ON (workcenter_id)
+    workcenter_id, workcenter_id, time, oee, availability, performance, quality, produced,
+    waste_losses, downtime_losses, runtime_sec, first_running_time,
+    top_alarm_id, top_alarm, top_rejection
+FROM kpi_snapshot
+ORDER BY workcenter_id, time DESC
+ON CONFLICT (id) DO NOTHING;
+
+CREATE OR REPLACE VIEW kpi_snapshot_history AS
+SELECT
+    EXTRACT(EPOCH FROM time)::BIGINT * 100000 + workcenter_id as id,
+    workcenter_id,
+    time,
+    oee,
+    availability,
+    performance,
+    produced,
+    top_alarm_id
+FROM kpi_snapshot;